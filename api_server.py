@@ -1,24 +1,38 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Literal, Optional
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 import time
 import asyncio
-from functools import partial
+from contextlib import asynccontextmanager, aclosing
+import json
 
-from brave_search.brave_search_function import web_search, parse_web_search_result
-from web_page_parse.parse_web_function import parse_multiple_pages
-from similiarity_search.chunck_split import chunk_split
-from similiarity_search.ss_aml import embed_texts, embed_text
-from similiarity_search.ss_faiss import faiss_search
-from query_expand.qe_openai import expand_query
+from search_engine import engine, search_events, async_search_pipeline, async_batch_search_pipeline
+from config.setting import RETRIEVAL_MODE, FUSION_METHOD, BATCH_MAX_QUERIES
+from utils.metrics import monitor_event_loop_lag, render_metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the search engine (HTTP pools, embedding service, ...) for the lifetime of the app"""
+    await engine.start()
+    # Warm up in the background; /health reports ready once it is done
+    warmup_task = asyncio.create_task(engine.warmup())
+    lag_monitor_task = asyncio.create_task(monitor_event_loop_lag())
+    try:
+        yield
+    finally:
+        warmup_task.cancel()
+        lag_monitor_task.cancel()
+        await engine.close()
 
 # Create FastAPI application
 app = FastAPI(
     title="Web Search API",
     description="API for web search, text processing and similarity search",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -34,88 +48,65 @@ class SearchResult(BaseModel):
     """Search result model"""
     text: str = Field(..., description="Content of the search result")
     url: str = Field(..., description="Source URL of the content")
+    urls: List[str] = Field(default_factory=list, description="Every URL the content (or a near-duplicate of it) was found on")
     length: Optional[int] = Field(None, description="Length of the text content")
+    score: Optional[float] = Field(None, description="Cosine similarity to the query (bm25 and hybrid results are ordered by their fused rank, not by this)")
 
 class SearchResponse(BaseModel):
     """Search response model"""
     results: List[SearchResult] = Field(..., description="List of search results")
     total_results: int = Field(..., description="Total number of results")
+    partial: bool = Field(False, description="The deadline cut the search short; results cover only the pages that arrived")
+    source: Optional[str] = Field(None, description="'local' if answered from the local index (dense mode only), 'web' if searched")
+
+class BatchSearchRequest(BaseModel):
+    """Batch search request model"""
+    queries: List[str] = Field(..., description="Search queries", min_length=1, max_length=BATCH_MAX_QUERIES)
+    top_k: int = Field(5, description="Number of results to return per query", ge=1, le=20)
+    chunk_size: int = Field(256, description="Size of text chunks", ge=50, le=1000)
+    chunk_overlap: int = Field(50, description="Overlap size between chunks", ge=0, le=200)
+    verbose: bool = Field(False, description="Enable detailed logging")
+    retrieval_mode: Literal["dense", "bm25", "hybrid"] = Field(RETRIEVAL_MODE, description="Ranking: embeddings, BM25 or both fused")
+    fusion: Literal["rrf", "weighted"] = Field(FUSION_METHOD, description="How hybrid mode fuses the two rankings")
+    deadline_ms: Optional[int] = Field(None, description="Time budget for the whole batch in ms", ge=100, le=120000)
+
+class BatchQueryResult(SearchResponse):
+    """Results for one query of a batch"""
+    query: str = Field(..., description="The query these results answer")
+    source: str = Field(..., description="'local' if answered from the local index, else 'web'")
+    error: Optional[str] = Field(None, description="Why the web search for this query failed, if it did")
+
+class BatchSearchResponse(BaseModel):
+    """Batch search response model"""
+    results: List[BatchQueryResult] = Field(..., description="Results per query, in request order")
+
+def to_search_results(results: List[Dict]) -> List[SearchResult]:
+    return [
+        SearchResult(
+            text=result["text"],
+            url=result["url"],
+            urls=result.get("urls", [result["url"]]),
+            length=len(result["text"]),
+            score=result.get("score")
+        )
+        for result in results
+    ]
 
 @app.get("/", response_model=Dict[str, str])
 async def root():
     """Root endpoint for API status check"""
     return {"status": "running", "message": "Search API is running"}
 
-async def async_search_pipeline(
-    query: str,
-    top_k: int = 5,
-    chunk_size: int = 256,
-    chunk_overlap: int = 50,
-    verbose: bool = False
-):
-    """Asynchronous search pipeline implementation"""
-    try:
-        # 1. Query expansion
-        expanded_query = expand_query(query)
-        
-        # 2. Web search
-        search_result = await web_search(expanded_query)
-        web_results, news_results = parse_web_search_result(search_result)
-        
-        if verbose:
-            print(f"Found {len(web_results)} web results and {len(news_results)} news results")
-        
-        # 3. Collect URLs
-        urls = [i['url'] for i in web_results + news_results]
-        if verbose:
-            print(f"Processing {len(urls)} URLs...")
-        
-        # 4. Parse pages
-        results = await parse_multiple_pages(urls)
-        
-        # 5. Process results
-        web_text_dict = {}
-        for url, text, _ in results:
-            if not text.strip():
-                continue
-            
-            # Split text into chunks
-            text_chunks = chunk_split(text, chunk_size=chunk_size, overlap=chunk_overlap)
-            for chunk in text_chunks:
-                if chunk.strip():
-                    web_text_dict[chunk] = url
-        
-        # 6. Vectorize and search
-        text_list = list(web_text_dict.keys())
-        if not text_list:
-            return [], {}
-            
-        vectors = embed_texts(text_list)
-        query_vector = embed_text(query)
-        similar_indices = faiss_search(query_vector, vectors, k=min(top_k, len(text_list)))
-        
-        # 7. Prepare results
-        final_results = []
-        for idx in similar_indices:
-            text = text_list[idx]
-            url = web_text_dict[text]
-            final_results.append({
-                'text': text,
-                'url': url
-            })
-        
-        return final_results, {}
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
 @app.get("/search", response_model=SearchResponse)
 async def search(
     query: str = Query(..., description="Search query text", min_length=1),
     top_k: int = Query(5, description="Number of results to return", ge=1, le=20),
     chunk_size: int = Query(256, description="Size of text chunks", ge=50, le=1000),
     chunk_overlap: int = Query(50, description="Overlap size between chunks", ge=0, le=200),
-    verbose: bool = Query(False, description="Enable detailed logging")
+    verbose: bool = Query(False, description="Enable detailed logging"),
+    retrieval_mode: Literal["dense", "bm25", "hybrid"] = Query(RETRIEVAL_MODE, description="Ranking: embeddings, BM25 or both fused"),
+    fusion: Literal["rrf", "weighted"] = Query(FUSION_METHOD, description="How hybrid mode fuses the two rankings"),
+    deadline_ms: Optional[int] = Query(None, description="Time budget in ms; slower stages are cut short", ge=100, le=120000)
 ) -> SearchResponse:
     """
     Execute search query and return results
@@ -126,35 +117,36 @@ async def search(
     - chunk_size: Size of text chunks (50-1000)
     - chunk_overlap: Overlap size between chunks (0-200)
     - verbose: Enable detailed logging
+    - retrieval_mode: dense, bm25 or hybrid
+    - fusion: rrf or weighted (hybrid mode only)
+    - deadline_ms: Time budget (100-120000); when it runs out the results
+      cover only the pages fetched so far and partial is set
     
     Returns:
     - SearchResponse: Response containing search results
     """
     try:
         # Call async search pipeline
-        results, _ = await async_search_pipeline(
+        results, meta = await async_search_pipeline(
             query=query,
             top_k=top_k,
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
-            verbose=verbose
+            verbose=verbose,
+            retrieval_mode=retrieval_mode,
+            fusion=fusion,
+            deadline_ms=deadline_ms
         )
         
         # Process results
-        search_results = []
-        for result in results:
-            search_results.append(
-                SearchResult(
-                    text=result["text"],
-                    url=result["url"],
-                    length=len(result["text"])
-                )
-            )
+        search_results = to_search_results(results)
         
         # Build response
         response = SearchResponse(
             results=search_results,
-            total_results=len(results)
+            total_results=len(results),
+            partial=meta.get('partial', False),
+            source=meta.get('source')
         )
         
         return response
@@ -165,9 +157,103 @@ async def search(
             detail=f"Error during search: {str(e)}"
         )
 
+def encode_event(event: Dict, stream_format: str) -> str:
+    data = json.dumps(event['data'], ensure_ascii=False)
+    if stream_format == "sse":
+        return f"event: {event['event']}\ndata: {data}\n\n"
+    return json.dumps({'event': event['event'], 'data': event['data']}, ensure_ascii=False) + "\n"
+
+@app.get("/search/stream")
+async def search_stream(
+    query: str = Query(..., description="Search query text", min_length=1),
+    top_k: int = Query(5, description="Number of results to return", ge=1, le=20),
+    chunk_size: int = Query(256, description="Size of text chunks", ge=50, le=1000),
+    chunk_overlap: int = Query(50, description="Overlap size between chunks", ge=0, le=200),
+    verbose: bool = Query(False, description="Enable detailed logging"),
+    retrieval_mode: Literal["dense", "bm25", "hybrid"] = Query(RETRIEVAL_MODE, description="Ranking: embeddings, BM25 or both fused"),
+    fusion: Literal["rrf", "weighted"] = Query(FUSION_METHOD, description="How hybrid mode fuses the two rankings"),
+    format: Literal["ndjson", "sse"] = Query("ndjson", description="Stream as newline-delimited JSON or server-sent events"),
+    deadline_ms: Optional[int] = Query(None, description="Time budget in ms; slower stages are cut short", ge=100, le=120000)
+) -> StreamingResponse:
+    """
+    Streaming variant of /search
+    
+    Emits stage events, the expanded query, the Brave hits and a top-k that
+    improves as pages are embedded, then the final result (see
+    search_events). A failure is reported as an 'error' event that ends the
+    stream. Parameters are those of /search plus:
+    - format: ndjson (one {"event", "data"} object per line) or sse
+    """
+    async def stream():
+        events = search_events(
+            query, top_k, chunk_size, chunk_overlap, verbose, retrieval_mode, fusion, deadline_ms=deadline_ms
+        )
+        async with aclosing(events):
+            try:
+                async for event in events:
+                    yield encode_event(event, format)
+            except Exception as e:
+                yield encode_event({'event': 'error', 'data': {'detail': str(e)}}, format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch(request: BatchSearchRequest) -> BatchSearchResponse:
+    """
+    Execute several related queries, fetching and embedding shared pages once
+    
+    Returns:
+    - BatchSearchResponse: Results for every query, in request order
+    """
+    try:
+        answers = await async_batch_search_pipeline(
+            queries=request.queries,
+            top_k=request.top_k,
+            chunk_size=request.chunk_size,
+            chunk_overlap=request.chunk_overlap,
+            verbose=request.verbose,
+            retrieval_mode=request.retrieval_mode,
+            fusion=request.fusion,
+            deadline_ms=request.deadline_ms
+        )
+        return BatchSearchResponse(results=[
+            BatchQueryResult(
+                query=answer['query'],
+                results=to_search_results(answer['results']),
+                total_results=len(answer['results']),
+                source=answer['source'],
+                error=answer['error'],
+                partial=answer['partial']
+            )
+            for answer in answers
+        ])
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error during batch search: {str(e)}"
+        )
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: per-stage latency, per-host fetches, batch sizes, cache hit rates, event-loop lag"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint, returns 503 until warmup has completed"""
+    if not engine.ready:
+        error = engine.warmup_error
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "unhealthy" if error else "starting",
+                "detail": error,
+                "timestamp": time.time()
+            }
+        )
     return {
         "status": "healthy",
         "timestamp": time.time()
@@ -191,10 +277,16 @@ curl "http://localhost:8000/search?query=china+australia+relations"
 2. Advanced search with all parameters:
 curl "http://localhost:8000/search?query=china+australia+relations&top_k=10&chunk_size=300&chunk_overlap=50&verbose=true"
 
-3. Health check:
+3. Streaming search (newline-delimited JSON events; add &format=sse for server-sent events):
+curl -N "http://localhost:8000/search/stream?query=china+australia+relations"
+
+4. Batch search:
+curl -X POST "http://localhost:8000/search/batch" -H "Content-Type: application/json" -d '{"queries": ["svb collapse", "svb deposit run"], "top_k": 5}'
+
+5. Health check:
 curl "http://localhost:8000/health"
 
-4. API status:
+6. API status:
 curl "http://localhost:8000/"
 
 Note: For Windows PowerShell, replace single quotes with double quotes and escape inner quotes:
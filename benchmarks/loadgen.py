@@ -0,0 +1,292 @@
+"""
+Concurrency load generator for api_server
+
+Usage:
+    python -m benchmarks.loadgen --levels 1 2 4 8 16 32 --duration 20 --output loadtest.json
+    python -m benchmarks.loadgen --workers 4 --page-latency-ms 150 --page-latency-sigma 0.6 --hosts 8
+    python -m benchmarks.loadgen --server-url http://127.0.0.1:8000 --skip-upstream
+
+Starts the mock upstream (mock_upstream.py) and `uvicorn api_server:app` as
+subprocesses configured for offline use (stub expander, caches off unless
+--keep-caches), waits for /health, then runs a closed loop at each
+concurrency level: N clients each send one /search request after another
+for --duration seconds. Every query is made unique so that caches and
+request coalescing do not hide work.
+
+Per level it reports throughput, latency percentiles of successful
+requests, error and timeout rates, peak RSS of the server process tree
+(workers and extraction processes included) and, with a single worker, the
+mean event-loop lag from /metrics. Results are written as JSON to --output.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+import numpy as np
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.mock_upstream import BRAVE_PATH, Fixtures, add_arguments
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Same offline, cold-cache configuration as the microbenchmarks
+OFFLINE_ENV = {
+    "QUERY_EXPANDER": "stub",
+    "BRAVE_SEARCH_API_KEY": "offline-benchmark",
+}
+NO_CACHE_ENV = {
+    "BRAVE_CACHE_SIZE": "0",
+    "EXPANSION_CACHE_SIZE": "0",
+    "EXPANSION_CACHE_PATH": "",
+    "PAGE_CACHE_PATH": "",
+    "EMBEDDING_CACHE_DIR": "",
+    "VECTOR_STORE_DIR": "",
+}
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    # Own process group, so workers and pool processes are stopped with it
+    return subprocess.Popen(args, cwd=ROOT, env=env, start_new_session=True)
+
+def stop_process(process: Optional[subprocess.Popen]) -> None:
+    if process is None or process.poll() is not None:
+        return
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+async def wait_until_up(session: aiohttp.ClientSession, url: str, timeout: float, process=None) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Process exited with status {process.returncode} before {url} came up")
+        try:
+            async with session.get(url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+class RssSampler:
+    """Samples the summed RSS of a process and its children, keeping the peak"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.1):
+        self.process = psutil.Process(pid) if pid else None
+        self.interval = interval
+        self.peak = 0
+
+    def sample(self) -> int:
+        if self.process is None:
+            return 0
+        total = 0
+        try:
+            for proc in [self.process] + self.process.children(recursive=True):
+                try:
+                    total += proc.memory_info().rss
+                except psutil.NoSuchProcess:
+                    pass
+        except psutil.NoSuchProcess:
+            return 0
+        self.peak = max(self.peak, total)
+        return total
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.to_thread(self.sample)
+            await asyncio.sleep(self.interval)
+
+LAG_SUM_RE = re.compile(r"^event_loop_lag_seconds_sum (\S+)$", re.M)
+LAG_COUNT_RE = re.compile(r"^event_loop_lag_seconds_count (\S+)$", re.M)
+
+async def read_loop_lag(session: aiohttp.ClientSession, server_url: str) -> Optional[tuple]:
+    try:
+        async with session.get(f"{server_url}/metrics") as response:
+            text = await response.text()
+    except aiohttp.ClientError:
+        return None
+    total, count = LAG_SUM_RE.search(text), LAG_COUNT_RE.search(text)
+    if not total or not count:
+        return None
+    return float(total.group(1)), float(count.group(1))
+
+async def run_level(
+    session: aiohttp.ClientSession,
+    server_url: str,
+    path: str,
+    queries: List[str],
+    concurrency: int,
+    duration: float,
+    timeout: float,
+    params: Dict[str, str],
+    counter: List[int]
+) -> Dict:
+    latencies, errors, timeouts = [], 0, 0
+    stop_at = time.monotonic() + duration
+
+    async def client() -> None:
+        nonlocal errors, timeouts
+        while time.monotonic() < stop_at:
+            counter[0] += 1
+            query = f"{queries[counter[0] % len(queries)]} {counter[0]}"
+            start = time.perf_counter()
+            try:
+                async with session.get(f"{server_url}{path}", params={"query": query, **params},
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    await response.read()
+                    if response.status == 200:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors += 1
+            except asyncio.TimeoutError:
+                timeouts += 1
+            except aiohttp.ClientError:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    total = len(latencies) + errors + timeouts
+    result = {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        "error_rate": errors / total if total else 0.0,
+        "timeout_rate": timeouts / total if total else 0.0,
+    }
+    if latencies:
+        ms = np.array(latencies) * 1000
+        result.update({
+            "latency_mean_ms": float(ms.mean()),
+            "latency_p50_ms": float(np.percentile(ms, 50)),
+            "latency_p90_ms": float(np.percentile(ms, 90)),
+            "latency_p99_ms": float(np.percentile(ms, 99)),
+            "latency_max_ms": float(ms.max()),
+        })
+    return result
+
+async def run(args: argparse.Namespace) -> Dict:
+    # Explicit environment variables still win, as in the microbenchmarks
+    env = {**OFFLINE_ENV, **({} if args.keep_caches else NO_CACHE_ENV), **os.environ}
+    upstream_url = f"http://127.0.0.1:{args.port}"
+    env.setdefault("BRAVE_SEARCH_ENDPOINT", f"{upstream_url}{BRAVE_PATH}")
+
+    upstream = server = None
+    server_url = args.server_url or f"http://127.0.0.1:{args.server_port}"
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        try:
+            if not args.skip_upstream:
+                upstream = start_process([
+                    sys.executable, "-m", "benchmarks.mock_upstream",
+                    "--port", str(args.port), "--fixtures", args.fixtures,
+                    "--brave-latency-ms", str(args.brave_latency_ms),
+                    "--page-latency-ms", str(args.page_latency_ms),
+                    "--page-latency-sigma", str(args.page_latency_sigma),
+                    "--size-scale", str(args.size_scale), "--size-sigma", str(args.size_sigma),
+                    "--error-rate", str(args.error_rate), "--hosts", str(args.hosts), "--seed", str(args.seed),
+                ], env)
+                await wait_until_up(session, f"{upstream_url}{BRAVE_PATH}?q=ping", 30, upstream)
+            if not args.server_url:
+                server = start_process([
+                    sys.executable, "-m", "uvicorn", "api_server:app",
+                    "--host", "127.0.0.1", "--port", str(args.server_port),
+                    "--workers", str(args.workers), "--log-level", "warning",
+                ], env)
+            await wait_until_up(session, f"{server_url}/health", args.startup_timeout, server)
+
+            sampler = RssSampler(server.pid if server else None)
+            queries = list(Fixtures(args.fixtures).queries)
+            params = {"top_k": str(args.top_k)}
+            counter = [0]
+            levels = []
+            for concurrency in args.levels:
+                sampler.peak = sampler.sample()
+                lag_before = await read_loop_lag(session, server_url)
+                sampling = asyncio.create_task(sampler.run())
+                try:
+                    result = await run_level(session, server_url, args.path, queries, concurrency,
+                                             args.duration, args.timeout, params, counter)
+                finally:
+                    sampling.cancel()
+                result["peak_rss_mb"] = sampler.peak / 2**20 if server else None
+                lag_after = await read_loop_lag(session, server_url)
+                if args.workers == 1 and lag_before and lag_after and lag_after[1] > lag_before[1]:
+                    result["event_loop_lag_mean_ms"] = (
+                        (lag_after[0] - lag_before[0]) / (lag_after[1] - lag_before[1]) * 1000
+                    )
+                levels.append(result)
+                print_level(result)
+                await asyncio.sleep(args.cooldown)
+        finally:
+            stop_process(server)
+            stop_process(upstream)
+
+    return {
+        "config": {
+            "path": args.path, "levels": args.levels, "duration": args.duration, "timeout": args.timeout,
+            "workers": args.workers, "keep_caches": args.keep_caches, "top_k": args.top_k,
+            "upstream": {
+                "brave_latency_ms": args.brave_latency_ms, "page_latency_ms": args.page_latency_ms,
+                "page_latency_sigma": args.page_latency_sigma, "size_scale": args.size_scale,
+                "size_sigma": args.size_sigma, "error_rate": args.error_rate, "hosts": args.hosts,
+            },
+            "cpus": os.cpu_count(),
+        },
+        "levels": levels,
+    }
+
+def print_header() -> None:
+    print(f"{'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'err%':>6} {'tmo%':>6} {'RSS MB':>8} {'lag ms':>7}")
+
+def print_level(result: Dict) -> None:
+    def fmt(key, width, scale=1.0, digits=0):
+        value = result.get(key)
+        return f"{'-':>{width}}" if value is None else f"{value * scale:>{width}.{digits}f}"
+    print(
+        f"{result['concurrency']:>5} {result['throughput_rps']:>8.2f} {fmt('latency_p50_ms', 8)} "
+        f"{fmt('latency_p90_ms', 8)} {fmt('latency_p99_ms', 8)} {fmt('error_rate', 6, 100, 1)} "
+        f"{fmt('timeout_rate', 6, 100, 1)} {fmt('peak_rss_mb', 8)} {fmt('event_loop_lag_mean_ms', 7, 1, 1)}"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test api_server at increasing concurrency")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="Concurrency levels")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per level")
+    parser.add_argument("--cooldown", type=float, default=2, help="Pause between levels")
+    parser.add_argument("--timeout", type=float, default=30, help="Client timeout per request")
+    parser.add_argument("--path", default="/search", help="GET endpoint to drive")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--server-port", type=int, default=8000)
+    parser.add_argument("--server-url", help="Drive an already running server instead of starting one")
+    parser.add_argument("--skip-upstream", action="store_true", help="Do not start the mock upstream")
+    parser.add_argument("--keep-caches", action="store_true", help="Leave the server's caches enabled")
+    parser.add_argument("--startup-timeout", type=float, default=300, help="Max wait for the server warmup")
+    parser.add_argument("--output", default="loadtest.json", help="Write the results to this JSON file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    print_header()
+    report = asyncio.run(run(args))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
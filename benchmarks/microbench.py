@@ -0,0 +1,233 @@
+"""
+Offline per-stage benchmarks with regression checks against a stored baseline
+
+Usage:
+    python -m benchmarks.microbench
+    python -m benchmarks.microbench --save-baseline benchmarks/baseline.json
+    python -m benchmarks.microbench --baseline benchmarks/baseline.json --tolerance 0.15
+    python -m benchmarks.microbench --only split_page top_k_search_2k
+    python -m benchmarks.microbench --pipeline --page-latency-ms 100 --page-latency-sigma 0.5
+
+Stage benchmarks run on the fixture corpus (benchmarks/fixtures) and need no
+network: trafilatura extraction, split_page (chunking as the pipeline does
+it), embed_texts, top_k_search (dense top-k below and above FAISS_THRESHOLD)
+and retrieve (hybrid BM25 + dense ranking over a request-sized chunk set).
+--pipeline also runs the full async search pipeline against an in-process
+mock upstream (see mock_upstream.py) with the stub query expander and all
+persistent caches disabled, so every query is cold.
+
+Each benchmark reports median / p90 / min wall time over --repeat runs. With
+--baseline, medians more than --tolerance slower than the baseline are
+reported as regressions and the exit status is 1. Baselines are machine
+specific: record one with --save-baseline on the machine you compare on.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Offline, cold-cache configuration; must be in place before project modules
+# read config.setting. Explicit environment variables still win.
+OFFLINE_ENV = {
+    "QUERY_EXPANDER": "stub",
+    "BRAVE_SEARCH_API_KEY": "offline-benchmark",
+    "BRAVE_CACHE_SIZE": "0",
+    "EXPANSION_CACHE_SIZE": "0",
+    "EXPANSION_CACHE_PATH": "",
+    "PAGE_CACHE_PATH": "",
+    "EMBEDDING_CACHE_DIR": "",
+    "VECTOR_STORE_DIR": "",
+}
+for _name, _value in OFFLINE_ENV.items():
+    os.environ.setdefault(_name, _value)
+
+from benchmarks.mock_upstream import Fixtures, add_arguments, from_arguments
+
+def measure(fn: Callable[[], None], repeat: int, warmup: int) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return summarize(durations)
+
+def summarize(durations_ms: List[float]) -> Dict[str, float]:
+    return {
+        "median_ms": statistics.median(durations_ms),
+        "p90_ms": float(np.percentile(durations_ms, 90)),
+        "min_ms": min(durations_ms),
+        "runs": len(durations_ms),
+    }
+
+class Corpus:
+    """Fixture pages, their extracted text and chunks, built once and shared by the benchmarks"""
+
+    def __init__(self, fixtures: Fixtures):
+        from web_page_parse.extract_pool import extract_text
+        from similiarity_search.stream_embed import split_page
+        self.pages = list(fixtures.pages.values())
+        self.texts = [extract_text(html) or "" for html in self.pages]
+        self.chunks = [chunk for text in self.texts for chunk in split_page(text, 64, 16)]
+
+def bench_extract(corpus: Corpus) -> Callable[[], None]:
+    from web_page_parse.extract_pool import extract_text
+    return lambda: [extract_text(html) for html in corpus.pages]
+
+def bench_split_page(corpus: Corpus) -> Callable[[], None]:
+    from similiarity_search.stream_embed import split_page
+    # Long enough that the per-call overhead does not dominate
+    text = "\n".join(corpus.texts) * 20
+    return lambda: split_page(text, 256, 50)
+
+def bench_embed_texts(corpus: Corpus) -> Callable[[], None]:
+    from similiarity_search.ss_aml import embed_texts, warmup
+    warmup()
+    return lambda: embed_texts(corpus.chunks)
+
+def _random_unit_vectors(rng: np.random.Generator, count: int, dim: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def _bench_top_k_search(size: int, dim: int = 384) -> Callable[[Corpus], Callable[[], None]]:
+    def setup(corpus: Corpus) -> Callable[[], None]:
+        from similiarity_search.ss_faiss import top_k_search
+        rng = np.random.default_rng(0)
+        embedding = _random_unit_vectors(rng, size, dim)
+        queries = _random_unit_vectors(rng, 16, dim)
+        return lambda: [top_k_search(query, embedding, k=5, normalized=True) for query in queries]
+    return setup
+
+def bench_retrieve_hybrid(corpus: Corpus, size: int = 2000, dim: int = 384) -> Callable[[], None]:
+    from similiarity_search.hybrid import retrieve
+    # Real chunk texts for BM25, random vectors for the dense side
+    texts = (corpus.chunks * (size // max(1, len(corpus.chunks)) + 1))[:size]
+    rng = np.random.default_rng(0)
+    vectors = _random_unit_vectors(rng, len(texts), dim)
+    queries = [text[:80] for text in texts[::max(1, len(texts) // 16)][:16]]
+    query_vectors = _random_unit_vectors(rng, len(queries), dim)
+    return lambda: [
+        retrieve(query, vector, texts, vectors, 5, "hybrid", "rrf") for query, vector in zip(queries, query_vectors)
+    ]
+
+BENCHMARKS = {
+    "extract": bench_extract,
+    "split_page": bench_split_page,
+    "embed_texts": bench_embed_texts,
+    "top_k_search_2k": _bench_top_k_search(2000),
+    "top_k_search_50k": _bench_top_k_search(50000),
+    "retrieve_hybrid_2k": bench_retrieve_hybrid,
+}
+
+def bench_pipeline(upstream, args: argparse.Namespace) -> Dict[str, float]:
+    """End-to-end latency of async_search_pipeline against the mock upstream"""
+    async def run() -> List[float]:
+        from search_engine import engine, async_search_pipeline
+
+        await upstream.start()
+        await engine.start()
+        try:
+            queries = list(upstream.fixtures.queries)
+            for query in queries[:args.warmup]:
+                await async_search_pipeline(query)
+            durations = []
+            for i in range(args.repeat):
+                start = time.perf_counter()
+                await async_search_pipeline(queries[i % len(queries)])
+                durations.append((time.perf_counter() - start) * 1000)
+            return durations
+        finally:
+            await engine.close()
+            await upstream.close()
+
+    return summarize(asyncio.run(run()))
+
+def environment() -> Dict[str, str]:
+    from config.setting import EMBEDDING_MODEL, EMBEDDING_BACKEND
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": str(os.cpu_count()),
+        "embedding": f"{EMBEDDING_MODEL}@{EMBEDDING_BACKEND}",
+    }
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print current vs baseline medians; return the names of regressed benchmarks"""
+    regressions = []
+    print(f"\n{'benchmark':<18} {'baseline ms':>12} {'current ms':>11} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get("results", {}).get(name)
+        if "median_ms" not in result or not before or "median_ms" not in before:
+            print(f"{name:<18} {'-':>12} {result.get('median_ms', float('nan')):>11.2f} {'n/a':>8}")
+            continue
+        change = result["median_ms"] / before["median_ms"] - 1
+        status = ""
+        if change > tolerance:
+            status = "  REGRESSION"
+            regressions.append(name)
+        elif change < -tolerance:
+            status = "  improved"
+        print(f"{name:<18} {before['median_ms']:>12.2f} {result['median_ms']:>11.2f} {change:>+7.1%}{status}")
+    if baseline.get("environment") != environment():
+        print("\nNote: baseline was recorded in a different environment, comparisons may not be meaningful")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline pipeline stage benchmarks")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="Run only these stage benchmarks")
+    parser.add_argument("--pipeline", action="store_true", help="Also benchmark the end-to-end pipeline")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--baseline", help="Compare against this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before reporting a regression")
+    parser.add_argument("--save-baseline", help="Write the results to this baseline JSON")
+    parser.add_argument("--json", help="Also write the results to this JSON file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    upstream = from_arguments(args)
+    if args.pipeline:
+        os.environ.setdefault("BRAVE_SEARCH_ENDPOINT", upstream.brave_endpoint)
+    corpus = Corpus(upstream.fixtures)
+    print(f"Corpus: {len(corpus.pages)} pages, {len(corpus.chunks)} chunks")
+
+    results = {}
+    for name in args.only or list(BENCHMARKS):
+        try:
+            fn = BENCHMARKS[name](corpus)
+            results[name] = measure(fn, args.repeat, args.warmup)
+        except (ImportError, OSError) as e:
+            results[name] = {"skipped": str(e)}
+        print(f"{name:<18} {json.dumps(results[name])}")
+    if args.pipeline:
+        results["pipeline"] = bench_pipeline(upstream, args)
+        print(f"{'pipeline':<18} {json.dumps(results['pipeline'])}")
+
+    report = {"environment": environment(), "results": results}
+    for path in (args.save_baseline, args.json):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
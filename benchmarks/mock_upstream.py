@@ -0,0 +1,231 @@
+"""
+Local stand-in for the Brave Search API and the web, for offline benchmarks
+
+Usage:
+    python -m benchmarks.mock_upstream --port 8799 --page-latency-ms 150 --page-latency-sigma 0.6
+
+    BRAVE_SEARCH_ENDPOINT=http://127.0.0.1:8799/res/v1/web/search QUERY_EXPANDER=stub \\
+        BRAVE_SEARCH_API_KEY=offline python api_server.py
+
+Brave requests are answered with the recorded responses in fixtures/brave
+(looked up by query in fixtures/manifest.json, other queries get a recorded
+response picked by hash). Every result URL is rewritten to point back at
+this server, which serves the recorded page for that URL, or a fixture page
+picked by hash for URLs that were not recorded. Page latency and size follow
+log-normal distributions around --page-latency-ms and --size-scale; with
+--hosts N the pages are spread over 127.0.0.1..127.0.0.N (Linux) so per-host
+fetch limits behave as they would against distinct sites.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import math
+import random
+import re
+import zlib
+from typing import Dict, Optional
+from urllib.parse import quote, urlsplit
+
+from aiohttp import web
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.cache import normalize_text
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BRAVE_PATH = "/res/v1/web/search"
+PARAGRAPH_RE = re.compile(r"<p\b[^>]*>.*?</p>", re.S | re.I)
+
+def _stable_hash(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+class Fixtures:
+    """Recorded Brave responses and HTML pages, as listed in manifest.json"""
+
+    def __init__(self, directory: str = FIXTURES_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.queries = {normalize_text(q): self._load_json(path) for q, path in manifest["queries"].items()}
+        self.responses = list(self.queries.values())
+        self.page_files = dict(manifest["pages"])
+        pages_dir = os.path.join(directory, "pages")
+        self.pages = {
+            name: self._read(os.path.join("pages", name)) for name in sorted(os.listdir(pages_dir)) if name.endswith(".html")
+        }
+        self.page_names = list(self.pages)
+
+    def _load_json(self, path: str) -> Dict:
+        return json.loads(self._read(path))
+
+    def _read(self, path: str) -> str:
+        with open(os.path.join(self.directory, path), encoding="utf-8") as f:
+            return f.read()
+
+    def response_for(self, query: str) -> Dict:
+        response = self.queries.get(normalize_text(query))
+        if response is None:
+            response = self.responses[_stable_hash(normalize_text(query)) % len(self.responses)]
+        return copy.deepcopy(response)
+
+    def page_for(self, url: str) -> str:
+        """Fixture page name served for a (recorded) result URL"""
+        path = self.page_files.get(url)
+        if path is not None:
+            return os.path.basename(path)
+        return self.page_names[_stable_hash(url) % len(self.page_names)]
+
+def pad_page(html: str, scale: float) -> str:
+    """Repeat the page's paragraphs inside its main content until it is ~scale times larger"""
+    if scale <= 1:
+        return html
+    paragraphs = PARAGRAPH_RE.findall(html)
+    if not paragraphs:
+        return html
+    target = int(len(html) * scale)
+    extra, size, i = [], len(html), 0
+    while size < target:
+        extra.append(paragraphs[i % len(paragraphs)])
+        size += len(extra[-1])
+        i += 1
+    anchor = "</article>" if "</article>" in html else "</body>"
+    head, _, tail = html.partition(anchor)
+    return f"{head}{''.join(extra)}{anchor}{tail}"
+
+class MockUpstream:
+    """aiohttp app serving the Brave stand-in and the fixture pages"""
+
+    def __init__(
+        self,
+        fixtures: Optional[Fixtures] = None,
+        brave_latency_ms: float = 0,
+        page_latency_ms: float = 0,
+        page_latency_sigma: float = 0,
+        size_scale: float = 1,
+        size_sigma: float = 0,
+        error_rate: float = 0,
+        hosts: int = 1,
+        port: int = 8799,
+        seed: int = 0
+    ):
+        self.fixtures = fixtures or Fixtures()
+        self.brave_latency_ms = brave_latency_ms
+        self.page_latency_ms = page_latency_ms
+        self.page_latency_sigma = page_latency_sigma
+        self.size_scale = size_scale
+        self.size_sigma = size_sigma
+        self.error_rate = error_rate
+        self.hosts = [f"127.0.0.{i}" for i in range(1, max(1, hosts) + 1)]
+        self.port = port
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._sized_pages = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def brave_endpoint(self) -> str:
+        return f"http://{self.hosts[0]}:{self.port}{BRAVE_PATH}"
+
+    def _latency(self, median_ms: float, sigma: float) -> float:
+        if median_ms <= 0:
+            return 0.0
+        return median_ms * math.exp(sigma * self._rng.gauss(0, 1)) / 1000
+
+    def _page_url(self, url: str) -> str:
+        host = self.hosts[_stable_hash(urlsplit(url).netloc) % len(self.hosts)]
+        return f"http://{host}:{self.port}/pages/{self.fixtures.page_for(url)}?src={quote(url, safe='')}"
+
+    def _sized_page(self, name: str, src: str) -> str:
+        # The size multiplier is fixed per URL, so repeated fetches are identical
+        key = (name, src)
+        if key not in self._sized_pages:
+            rng = random.Random(f"{self.seed}:{src}")
+            scale = self.size_scale * math.exp(self.size_sigma * rng.gauss(0, 1))
+            self._sized_pages[key] = pad_page(self.fixtures.pages[name], scale)
+        return self._sized_pages[key]
+
+    async def brave(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self._latency(self.brave_latency_ms, 0))
+        response = self.fixtures.response_for(request.query.get("q", ""))
+        for section in ("web", "news"):
+            for result in response.get(section, {}).get("results", []):
+                result["url"] = self._page_url(result["url"])
+        return web.json_response(response)
+
+    async def page(self, request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        if name not in self.fixtures.pages:
+            raise web.HTTPNotFound()
+        await asyncio.sleep(self._latency(self.page_latency_ms, self.page_latency_sigma))
+        if self.error_rate and self._rng.random() < self.error_rate:
+            raise web.HTTPServiceUnavailable()
+        html = self._sized_page(name, request.query.get("src", name))
+        return web.Response(text=html, content_type="text/html", charset="utf-8")
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(BRAVE_PATH, self.brave)
+        app.router.add_get("/pages/{name}", self.page)
+        return app
+
+    async def start(self) -> None:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        for host in self.hosts:
+            await web.TCPSite(self._runner, host, self.port).start()
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Mock upstream options, shared with the benchmarks that start one in-process"""
+    group = parser.add_argument_group("mock upstream")
+    group.add_argument("--port", type=int, default=8799)
+    group.add_argument("--fixtures", default=FIXTURES_DIR, help="Fixture directory with manifest.json")
+    group.add_argument("--brave-latency-ms", type=float, default=0, help="Added latency of every Brave response")
+    group.add_argument("--page-latency-ms", type=float, default=0, help="Median page latency")
+    group.add_argument("--page-latency-sigma", type=float, default=0, help="Log-normal spread of page latency")
+    group.add_argument("--size-scale", type=float, default=1, help="Median page size multiplier (pages are padded)")
+    group.add_argument("--size-sigma", type=float, default=0, help="Log-normal spread of the size multiplier")
+    group.add_argument("--error-rate", type=float, default=0, help="Share of page requests answered with 503")
+    group.add_argument("--hosts", type=int, default=1, help="Loopback addresses to spread pages over")
+    group.add_argument("--seed", type=int, default=0)
+
+def from_arguments(args: argparse.Namespace) -> MockUpstream:
+    return MockUpstream(
+        Fixtures(args.fixtures),
+        brave_latency_ms=args.brave_latency_ms,
+        page_latency_ms=args.page_latency_ms,
+        page_latency_sigma=args.page_latency_sigma,
+        size_scale=args.size_scale,
+        size_sigma=args.size_sigma,
+        error_rate=args.error_rate,
+        hosts=args.hosts,
+        port=args.port,
+        seed=args.seed
+    )
+
+async def serve(upstream: MockUpstream) -> None:
+    await upstream.start()
+    print(f"Mock Brave endpoint: {upstream.brave_endpoint}")
+    print(f"Serving {len(upstream.fixtures.pages)} fixture pages on {', '.join(upstream.hosts)} port {upstream.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await upstream.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Brave Search and web page stand-in")
+    add_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(from_arguments(args)))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Record live Brave responses and the pages they link to as benchmark fixtures
+
+Usage:
+    BRAVE_SEARCH_API_KEY=... python -m benchmarks.record_fixtures "svb collapse" "fed rate decision"
+
+Needs the live Brave API and network access. Responses are written to
+fixtures/brave, pages to fixtures/pages, and both are added to
+fixtures/manifest.json for mock_upstream.py to replay.
+"""
+import argparse
+import asyncio
+import json
+import re
+import zlib
+
+import requests
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from brave_search.brave_search_function import web_search
+from benchmarks.mock_upstream import FIXTURES_DIR
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:60]
+
+def record(queries, directory: str = FIXTURES_DIR, timeout: float = 10) -> None:
+    manifest_path = os.path.join(directory, "manifest.json")
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    for query in queries:
+        response = asyncio.run(web_search(query))
+        path = f"brave/{slugify(query)}.json"
+        with open(os.path.join(directory, path), "w", encoding="utf-8") as f:
+            json.dump(response, f, indent=2)
+        manifest["queries"][query] = path
+
+        results = response.get("web", {}).get("results", []) + response.get("news", {}).get("results", [])
+        for result in results:
+            url = result["url"]
+            if url in manifest["pages"]:
+                continue
+            try:
+                page = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
+            except requests.RequestException as e:
+                print(f"Skipping {url}: {str(e)}")
+                continue
+            if page.status_code != 200 or "html" not in page.headers.get("Content-Type", ""):
+                print(f"Skipping {url}: status {page.status_code}, {page.headers.get('Content-Type')}")
+                continue
+            name = f"{slugify(query)}-{zlib.crc32(url.encode('utf-8')):08x}.html"
+            with open(os.path.join(directory, "pages", name), "w", encoding="utf-8") as f:
+                f.write(page.text)
+            manifest["pages"][url] = f"pages/{name}"
+        print(f"Recorded {query!r}: {len(results)} results")
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Record Brave responses and pages as benchmark fixtures")
+    parser.add_argument("queries", nargs="+")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    args = parser.parse_args()
+    record(args.queries, args.fixtures)
+
+if __name__ == "__main__":
+    main()
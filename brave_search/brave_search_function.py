@@ -1,11 +1,8 @@
 from dotenv import load_dotenv
 import os
 import aiohttp
-import asyncio
 import json
 
-BRAVE_SEARCH_ENDPOINT = "https://api.search.brave.com/res/v1/web/search"
-
 # load_dotenv()
 
 # brave_ai_api_key = os.getenv("BRAVE_AI_API_KEY")
@@ -13,22 +10,33 @@ BRAVE_SEARCH_ENDPOINT = "https://api.search.brave.com/res/v1/web/search"
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.setting import BRAVE_AI_API_KEY, BRAVE_SEARCH_API_KEY
-
+from config.setting import (
+    BRAVE_AI_API_KEY, BRAVE_SEARCH_API_KEY, BRAVE_SEARCH_ENDPOINT,
+    BRAVE_CACHE_SIZE, BRAVE_WEB_CACHE_TTL, BRAVE_NEWS_CACHE_TTL, BRAVE_TIMEOUT
+)
+from utils.background_loop import run_sync
+from utils.cache import TTLCache, normalize_text
+from utils.http_client import client_session
+from utils.metrics import observe_stage
 
+# 解析后的搜索结果缓存，键为 (规范化查询, 请求参数)
+search_cache = TTLCache(maxsize=BRAVE_CACHE_SIZE, ttl=BRAVE_WEB_CACHE_TTL)
 
         
-async def web_search(query):
-    async with aiohttp.ClientSession() as session:
+async def web_search(query, params=None):
+    async with client_session("brave") as session:
         url = BRAVE_SEARCH_ENDPOINT
         headers = {
             "Accept": "application/json",
             "Accept-Encoding": "gzip",
             "X-Subscription-Token": BRAVE_SEARCH_API_KEY
         }
-        async with session.get(url, headers=headers, params={"q": query}) as response:
-            search_result = await response.json()
-            return search_result
+        # 共享的上游请求在调用方超时后仍会继续，需要自己的超时
+        timeout = aiohttp.ClientTimeout(total=BRAVE_TIMEOUT)
+        with observe_stage("brave"):
+            async with session.get(url, headers=headers, params={**(params or {}), "q": query}, timeout=timeout) as response:
+                search_result = await response.json()
+        return search_result
 
 def parse_web_search_result(result):
     search_result_type = {i['type'] for i in result['mixed']['main']}
@@ -51,13 +59,45 @@ def parse_web_search_result(result):
             })
     return web_result, news_result
 
+def merge_search_results(primary, secondary):
+    """
+    合并两组 parse_web_search_result 的结果，按URL去重，primary 中的结果优先
+    """
+    merged = []
+    seen = set()
+    for primary_part, secondary_part in zip(primary, secondary):
+        part = []
+        for item in primary_part + secondary_part:
+            if item['url'] in seen:
+                continue
+            seen.add(item['url'])
+            part.append(item)
+        merged.append(part)
+    return tuple(merged)
+
+def _search_cache_ttl(parsed):
+    """新闻结果更新快，包含新闻的结果使用较短的新鲜度窗口"""
+    _, news_result = parsed
+    return BRAVE_NEWS_CACHE_TTL if news_result else BRAVE_WEB_CACHE_TTL
+
+async def cached_web_search(query, params=None):
+    """
+    带缓存的搜索，返回 parse_web_search_result 的结果 (web_result, news_result)
+
+    相同的查询和参数在新鲜度窗口内直接命中缓存；并发的相同请求只会调用一次 Brave API
+    """
+    key = (normalize_text(query), json.dumps(params or {}, sort_keys=True))
+
+    async def fetch():
+        return parse_web_search_result(await web_search(query, params))
+
+    return await search_cache.aget_or_compute(key, fetch, ttl=_search_cache_ttl)
+
 # 同步包装函数
 def search_and_parse(query):
     """
     同步调用搜索和解析函数的包装器
+
+    在共享的后台事件循环上运行，复用连接池，不再每次调用都新建事件循环
     """
-    async def run_search():
-        result = await web_search(query)
-        return parse_web_search_result(result)
-    
-    return asyncio.run(run_search())
\ No newline at end of file
+    return run_sync(cached_web_search(query))
\ No newline at end of file
@@ -5,6 +5,152 @@ load_dotenv()
 
 BRAVE_AI_API_KEY = os.getenv("BRAVE_AI_API_KEY")
 BRAVE_SEARCH_API_KEY = os.getenv("BRAVE_SEARCH_API_KEY")
+# Point at benchmarks/mock_upstream.py to run without the live API
+BRAVE_SEARCH_ENDPOINT = os.getenv("BRAVE_SEARCH_ENDPOINT", "https://api.search.brave.com/res/v1/web/search")
 
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
\ No newline at end of file
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Query expander: "openai", or "stub" for a deterministic offline expander
+# (benchmarks) that answers after QUERY_EXPANDER_STUB_DELAY_MS
+QUERY_EXPANDER = os.getenv("QUERY_EXPANDER", "openai")
+QUERY_EXPANDER_STUB_DELAY_MS = float(os.getenv("QUERY_EXPANDER_STUB_DELAY_MS", "0"))
+
+# Speculative search: run the raw query against Brave while query expansion
+# is in flight. "off" waits for the expansion (one Brave call per query),
+# "merge" unions the raw hits with the expanded hits, "discard" only uses
+# the raw hits if expansion fails. The speculative policies spend a second
+# Brave call per query; once the raw hits are in, the expanded search gets
+# at most SPECULATIVE_GRACE_MS more before the raw hits are used alone.
+SPECULATIVE_SEARCH = os.getenv("SPECULATIVE_SEARCH", "off")
+SPECULATIVE_GRACE_MS = float(os.getenv("SPECULATIVE_GRACE_MS", "300"))
+
+# Query expansion cache: LRU size, TTL in seconds and an optional JSON file
+# used to persist expansions across restarts (empty disables persistence)
+EXPANSION_CACHE_SIZE = int(os.getenv("EXPANSION_CACHE_SIZE", "1024"))
+EXPANSION_CACHE_TTL = float(os.getenv("EXPANSION_CACHE_TTL", "86400"))
+EXPANSION_CACHE_PATH = os.getenv("EXPANSION_CACHE_PATH", "")
+
+# Brave search result cache. Results containing news use the shorter news
+# freshness window, pure web results the web window (seconds)
+BRAVE_CACHE_SIZE = int(os.getenv("BRAVE_CACHE_SIZE", "2048"))
+BRAVE_WEB_CACHE_TTL = float(os.getenv("BRAVE_WEB_CACHE_TTL", "3600"))
+BRAVE_NEWS_CACHE_TTL = float(os.getenv("BRAVE_NEWS_CACHE_TTL", "300"))
+
+# Shared HTTP client pools: connection limits for the Brave API and for page
+# hosts, DNS cache TTL and keep-alive timeout (seconds)
+BRAVE_POOL_LIMIT = int(os.getenv("BRAVE_POOL_LIMIT", "20"))
+PAGE_POOL_LIMIT = int(os.getenv("PAGE_POOL_LIMIT", "100"))
+PAGE_POOL_LIMIT_PER_HOST = int(os.getenv("PAGE_POOL_LIMIT_PER_HOST", "8"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+
+# trafilatura extraction process pool: number of worker processes (0 runs
+# extraction in a thread instead), max documents queued or running at once,
+# and the per-document CPU time budget in seconds
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_MAX_PENDING = int(os.getenv("EXTRACT_MAX_PENDING", "64"))
+EXTRACT_CPU_TIMEOUT = float(os.getenv("EXTRACT_CPU_TIMEOUT", "2"))
+
+# Max number of chunks one request submits for embedding at a time
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Fetch scheduler: max page downloads in flight across all requests, and
+# per host
+FETCH_MAX_IN_FLIGHT = int(os.getenv("FETCH_MAX_IN_FLIGHT", "64"))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", "4"))
+
+# Extracted page cache (SQLite): database path (empty disables it), max total
+# size of stored text in bytes, and default TTL in seconds when the response
+# carries no Cache-Control max-age
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", ".cache/pages.sqlite")
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "3600"))
+
+# Directory of the memory-mapped chunk embedding cache (empty disables it)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+
+# Page download limits: max body size read per page (longer pages are
+# truncated) and the accepted Content-Types (comma separated)
+PAGE_MAX_BYTES = int(os.getenv("PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+PAGE_CONTENT_TYPES = frozenset(
+    t.strip() for t in os.getenv("PAGE_CONTENT_TYPES", "text/html,application/xhtml+xml").split(",")
+)
+
+# Unit of the chunk_size / chunk_overlap request parameters: "words", or
+# "tokens" of the embedding model's tokenizer (chunks then never exceed the
+# model's input limit; larger chunk_size values are capped at that limit)
+CHUNK_UNIT = os.getenv("CHUNK_UNIT", "words")
+
+# Max time (ms) the embedding service waits to merge concurrent requests
+# into one batch, and the max texts per merged model call (larger than
+# EMBED_BATCH_SIZE so full per-request batches can still be merged)
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+EMBED_SERVICE_MAX_BATCH = int(os.getenv("EMBED_SERVICE_MAX_BATCH", "256"))
+
+# Sentence embedding model and runtime backend: "torch" (fp32 PyTorch),
+# "onnx" (ONNX Runtime, needs optimum[onnxruntime]) or "int8" (PyTorch with
+# dynamically quantized Linear layers)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+# Retrieval switches from the numpy top-k kernel to a FAISS index at this
+# many vectors
+FAISS_THRESHOLD = int(os.getenv("FAISS_THRESHOLD", "20000"))
+
+# Persistent vector index over previously fetched chunks (empty directory
+# disables it). Chunks from news results expire sooner than web chunks.
+# Local results are served without searching the web when top_k of them
+# score at least VECTOR_STORE_MIN_SCORE.
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", ".cache/vector_store")
+VECTOR_STORE_WEB_TTL = float(os.getenv("VECTOR_STORE_WEB_TTL", str(7 * 86400)))
+VECTOR_STORE_NEWS_TTL = float(os.getenv("VECTOR_STORE_NEWS_TTL", "86400"))
+VECTOR_STORE_MIN_SCORE = float(os.getenv("VECTOR_STORE_MIN_SCORE", "0.75"))
+VECTOR_STORE_SNAPSHOT_INTERVAL = float(os.getenv("VECTOR_STORE_SNAPSHOT_INTERVAL", "300"))
+VECTOR_STORE_HNSW_M = int(os.getenv("VECTOR_STORE_HNSW_M", "32"))
+VECTOR_STORE_EF_SEARCH = int(os.getenv("VECTOR_STORE_EF_SEARCH", "64"))
+
+# Default retrieval mode: "dense" (embeddings only), "bm25" (lexical only)
+# or "hybrid" (both, fused by "rrf" reciprocal rank fusion or a "weighted"
+# sum with HYBRID_ALPHA on the dense side). Overridable per request. Result
+# scores are always cosine similarities, so they only decrease down the
+# result list in dense mode.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+FUSION_METHOD = os.getenv("FUSION_METHOD", "rrf")
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+
+# Near-duplicate filtering before embedding: pages and chunks whose MinHash
+# Jaccard estimate reaches DEDUP_THRESHOLD are merged (their URLs are kept).
+# DEDUP_NUM_PERM must be a multiple of DEDUP_BANDS. 0 disables it; exact
+# duplicate chunks are always merged.
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))
+
+# Timeouts in seconds: page download, whole page fetch (download, excluding
+# the wait for a fetch slot), query expansion and the Brave API call
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "3"))
+PARSE_TIMEOUT = float(os.getenv("PARSE_TIMEOUT", "3"))
+EXPANSION_TIMEOUT = float(os.getenv("EXPANSION_TIMEOUT", "10"))
+BRAVE_TIMEOUT = float(os.getenv("BRAVE_TIMEOUT", "5"))
+
+# End-to-end search deadline in ms (0 = none), overridable per request with
+# deadline_ms. Expansion is skipped when less than EXPANSION_MIN_BUDGET_MS
+# is left; fetching stops DEADLINE_RESERVE_MS (at most a fifth of the
+# budget) before the deadline so the pages that arrived can still be
+# embedded and ranked (results are then flagged partial).
+SEARCH_DEADLINE_MS = float(os.getenv("SEARCH_DEADLINE_MS", "0"))
+EXPANSION_MIN_BUDGET_MS = float(os.getenv("EXPANSION_MIN_BUDGET_MS", "1500"))
+DEADLINE_RESERVE_MS = float(os.getenv("DEADLINE_RESERVE_MS", "250"))
+
+# Min time (ms) between two progressive re-rankings of /search/stream; the
+# chunks embedded in between are ranked together at the next one
+PROGRESSIVE_RERANK_INTERVAL_MS = float(os.getenv("PROGRESSIVE_RERANK_INTERVAL_MS", "250"))
+
+# Max number of queries accepted by one POST /search/batch request
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "20"))
+
+# Distinct hosts labelled individually in the per-host fetch metrics; later
+# hosts are reported as "other"
+METRICS_MAX_HOSTS = int(os.getenv("METRICS_MAX_HOSTS", "200"))
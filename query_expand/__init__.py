@@ -1,3 +1,8 @@
-from .qe_openai import expand_query
+from config.setting import QUERY_EXPANDER
 
-__all__ = ['expand_query']
+if QUERY_EXPANDER == "stub":
+    from .qe_stub import expand_query, async_expand_query, warmup
+else:
+    from .qe_openai import expand_query, async_expand_query, warmup
+
+__all__ = ['expand_query', 'async_expand_query', 'warmup']
@@ -0,0 +1,38 @@
+import functools
+import inspect
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import EXPANSION_CACHE_SIZE, EXPANSION_CACHE_TTL, EXPANSION_CACHE_PATH
+from utils.cache import TTLCache, normalize_text
+
+# Shared by every expansion backend, entries are namespaced per backend
+expansion_cache = TTLCache(
+    maxsize=EXPANSION_CACHE_SIZE,
+    ttl=EXPANSION_CACHE_TTL,
+    path=EXPANSION_CACHE_PATH or None
+)
+
+def expansion_cache_key(namespace: str, query: str, *args) -> str:
+    """Build the cache key for a query expanded by the given backend"""
+    return "|".join([namespace, *map(str, args), normalize_text(query)])
+
+def cached_expansion(namespace: str):
+    """
+    Decorator putting an expand_query implementation behind the expansion cache
+
+    Extra arguments (e.g. the model name), with defaults applied, are part of
+    the key. The undecorated function stays reachable as `__wrapped__`.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            query, *extra = bound.args
+            key = expansion_cache_key(namespace, query, *extra)
+            return expansion_cache.get_or_compute(key, lambda: func(*bound.args))
+        return wrapper
+    return decorator
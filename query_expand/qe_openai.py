@@ -1,10 +1,28 @@
-import aisuite as ai
+import asyncio
+import threading
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.setting import OPENAI_API_KEY
+from query_expand.cache import cached_expansion, expansion_cache, expansion_cache_key
 
-client = ai.Client()
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Return the aisuite client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import aisuite as ai
+                _client = ai.Client()
+    return _client
+
+def warmup():
+    get_client()
 
 model = "openai:gpt-4o"
 
@@ -15,9 +33,13 @@ to find relevant results, which will then be use as context to helpanswer user q
 Please onlt return the query, no other text.
 """
 
+@cached_expansion("openai")
 def expand_query(query: str, models: str = model) -> str:
     """
     Expand a user query using OpenAI's GPT model.
+
+    Results are cached per normalized query and concurrent identical calls
+    share a single upstream request.
     
     Args:
         query (str): The original user query
@@ -30,13 +52,34 @@ def expand_query(query: str, models: str = model) -> str:
         {"role": "system", "content": sys_prompt},
         {"role": "user", "content": query}
     ]
-    response = client.chat.completions.create(
-        model=model,
+    response = get_client().chat.completions.create(
+        model=models,
         messages=messages,
         temperature=0.75
     )
     return response.choices[0].message.content
 
+async def async_expand_query(query: str, models: str = model) -> str:
+    """
+    Expand a user query without blocking the event loop.
+
+    aisuite only ships a synchronous client, so the blocking round-trip is
+    offloaded to the default thread pool executor. Cache hits are served
+    without leaving the event loop and concurrent identical queries await
+    the same upstream call.
+
+    Args:
+        query (str): The original user query
+        models (str, optional): The model to use. Defaults to model.
+
+    Returns:
+        str: The expanded query
+    """
+    key = expansion_cache_key("openai", query, models)
+    return await expansion_cache.aget_or_compute(
+        key, lambda: asyncio.to_thread(expand_query.__wrapped__, query, models)
+    )
+
 # For testing purposes
 if __name__ == "__main__":
     test_query = "What is the capital of France?"
@@ -0,0 +1,27 @@
+import asyncio
+import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import QUERY_EXPANDER_STUB_DELAY_MS
+
+def warmup():
+    pass
+
+def _expand(query: str) -> str:
+    # Deterministic, and different from the raw query so speculative search
+    # still issues two Brave requests
+    return f"{' '.join(query.split())} overview"
+
+def expand_query(query: str, models: str = None) -> str:
+    """
+    Offline stand-in for the OpenAI expander (QUERY_EXPANDER=stub), used by
+    the benchmarks. Sleeps QUERY_EXPANDER_STUB_DELAY_MS to model the
+    upstream round-trip.
+    """
+    time.sleep(QUERY_EXPANDER_STUB_DELAY_MS / 1000)
+    return _expand(query)
+
+async def async_expand_query(query: str, models: str = None) -> str:
+    await asyncio.sleep(QUERY_EXPANDER_STUB_DELAY_MS / 1000)
+    return _expand(query)
@@ -1,12 +1,36 @@
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import threading
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from query_expand.cache import cached_expansion
 
-# 加载模型和分词器
-tokenizer = AutoTokenizer.from_pretrained("google/flan-t5-small")
-model = AutoModelForSeq2SeqLM.from_pretrained("google/flan-t5-small")
+MODEL_NAME = "google/flan-t5-small"
 
+_tokenizer = None
+_model = None
+_load_lock = threading.Lock()
+
+def get_model():
+    """
+    首次调用时加载模型和分词器，导入本模块不再需要加载 FLAN-T5
+    """
+    global _tokenizer, _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+                _tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+                _model = AutoModelForSeq2SeqLM.from_pretrained(MODEL_NAME)
+    return _tokenizer, _model
+
+def warmup():
+    get_model()
+
+@cached_expansion("flan-t5-small")
 def expand_query(query):
     # 指令格式更自由（无需严格的前缀）
     input_text = f"Expand this search query to include related terms: {query}"
+    tokenizer, model = get_model()
     
     inputs = tokenizer(
         input_text,
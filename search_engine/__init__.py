@@ -0,0 +1,8 @@
+from .engine import engine, SearchEngine
+from .pipeline import search_events, async_search_pipeline, async_batch_search_pipeline
+from .sync import search_pipeline
+
+__all__ = [
+    'engine', 'SearchEngine', 'search_events', 'async_search_pipeline',
+    'async_batch_search_pipeline', 'search_pipeline'
+]
@@ -0,0 +1,179 @@
+"""
+Batch search over a JSONL file of queries
+
+Usage:
+    python -m search_engine.cli queries.jsonl -o results.jsonl --concurrency 16
+    python -m search_engine.cli queries.jsonl --deadline-ms 5000 --retrieval-mode dense > results.jsonl
+    python -m search_engine.cli queries.jsonl -o results.jsonl --resume
+
+Each input line is a JSON object with a "query" and an optional "id" (the
+line number by default), or a bare JSON string. All queries run on one
+event loop through the engine the API uses, so the HTTP pools, caches and
+the embedding model (with its cross-query micro-batching) serve every
+query; at most --concurrency queries are in flight at once.
+
+One JSON line is written per query as soon as it finishes (completion
+order): id, query, results, source, partial, error and elapsed seconds. A
+failing query is reported in its error field and does not stop the run.
+With --resume, ids already present in the output file are skipped and new
+lines are appended. Progress and pipeline logs go to stderr.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Dict, Iterator, Set, TextIO
+
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import RETRIEVAL_MODE, FUSION_METHOD
+from search_engine.engine import engine
+from search_engine.pipeline import async_search_pipeline
+
+PROGRESS_INTERVAL = 10  # Seconds between progress lines
+
+def read_queries(path: str) -> Iterator[Dict]:
+    """Yield {'id', 'query', ...} per valid input line ("-" reads stdin)"""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_no}: {str(e)}", file=sys.stderr)
+                continue
+            if isinstance(item, str):
+                item = {"query": item}
+            if not isinstance(item, dict) or not str(item.get("query") or "").strip():
+                print(f"Skipping line {line_no}: no query", file=sys.stderr)
+                continue
+            item.setdefault("id", line_no)
+            yield item
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def finished_ids(path: str) -> Set[str]:
+    """Ids (JSON encoded) of the records already in an output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.dumps(json.loads(line)["id"]))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+    return done
+
+async def run(args: argparse.Namespace, out: TextIO, skip: Set[str]) -> Dict[str, int]:
+    counts = {"done": 0, "errors": 0, "partial": 0, "skipped": 0}
+    start_time = last_report = time.perf_counter()
+
+    def report() -> None:
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"{counts['done']} queries in {elapsed:.1f}s ({counts['done'] / elapsed:.2f}/s), "
+            f"{counts['errors']} errors, {counts['partial']} partial",
+            file=sys.stderr
+        )
+
+    async def search(item: Dict) -> None:
+        nonlocal last_report
+        record = {"id": item["id"], "query": item["query"]}
+        query_start = time.perf_counter()
+        try:
+            results, meta = await async_search_pipeline(
+                item["query"], top_k=args.top_k, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                verbose=args.verbose, retrieval_mode=args.retrieval_mode, fusion=args.fusion,
+                deadline_ms=args.deadline_ms
+            )
+            record.update(
+                results=results, source=meta.get("source"), partial=meta.get("partial", False), error=None
+            )
+        except Exception as e:
+            record.update(results=[], source=None, partial=False, error=str(e))
+            counts["errors"] += 1
+        record["elapsed"] = time.perf_counter() - query_start
+        counts["done"] += 1
+        counts["partial"] += record["partial"]
+        # Scores may be numpy scalars
+        out.write(json.dumps(record, ensure_ascii=False, default=float) + "\n")
+        out.flush()
+        if time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.perf_counter()
+            report()
+
+    async def worker(queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            await search(item)
+
+    await engine.start()
+    try:
+        if not await engine.warmup():
+            raise RuntimeError(f"Warmup failed: {engine.warmup_error}")
+        # Bounded, so the input is read no faster than it is processed
+        queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+        workers = [asyncio.create_task(worker(queue)) for _ in range(args.concurrency)]
+        try:
+            for item in read_queries(args.input):
+                if json.dumps(item["id"]) in skip:
+                    counts["skipped"] += 1
+                    continue
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+    finally:
+        await engine.close()
+    report()
+    return counts
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the search pipeline over a JSONL file of queries")
+    parser.add_argument("input", help="JSONL file with one query per line (- for stdin)")
+    parser.add_argument("-o", "--output", help="Write results to this JSONL file instead of stdout")
+    parser.add_argument("--resume", action="store_true", help="Skip ids already in --output and append to it")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries in flight at once")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=256)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--retrieval-mode", choices=["dense", "bm25", "hybrid"], default=RETRIEVAL_MODE)
+    parser.add_argument("--fusion", choices=["rrf", "weighted"], default=FUSION_METHOD)
+    parser.add_argument("--deadline-ms", type=float, help="Time budget per query (see /search deadline_ms)")
+    parser.add_argument("--verbose", action="store_true", help="Pipeline logging (to stderr)")
+    args = parser.parse_args()
+    if args.resume and not args.output:
+        parser.error("--resume needs --output")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    skip = finished_ids(args.output) if args.resume else set()
+    out = open(args.output, "a" if args.resume else "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        # The pipeline logs with print; keep stdout for results only
+        with redirect_stdout(sys.stderr):
+            counts = asyncio.run(run(args, out, skip))
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    if counts["skipped"]:
+        print(f"Skipped {counts['skipped']} queries already in {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
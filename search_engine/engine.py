@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import List, Optional
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from brave_search.brave_search_function import search_cache
+from query_expand import warmup as warmup_expansion
+from query_expand.cache import expansion_cache
+from similiarity_search.embed_service import embedding_service
+from similiarity_search.ss_aml import warmup as warmup_embedding, get_embedding_cache
+from similiarity_search.vector_store import get_vector_store
+from config.setting import VECTOR_STORE_SNAPSHOT_INTERVAL
+from search_engine.pipeline import background_tasks
+from utils.http_client import http_clients
+from utils.metrics import cache_stats
+from web_page_parse.extract_pool import shutdown_extract_pool, warmup_extract_pool
+
+cache_stats.register("brave_search", search_cache)
+cache_stats.register("query_expansion", expansion_cache)
+
+async def maintain_vector_store():
+    """Periodically evict expired chunks and snapshot the local vector index"""
+    while True:
+        await asyncio.sleep(VECTOR_STORE_SNAPSHOT_INTERVAL)
+        store = await asyncio.to_thread(get_vector_store)
+        if store is None:
+            return
+        try:
+            await asyncio.to_thread(store.evict_expired)
+            await asyncio.to_thread(store.snapshot)
+        except Exception as e:
+            print(f"Vector store maintenance failed: {str(e)}")
+
+class SearchEngine:
+    """
+    Shared resources of the search pipeline (pipeline.py) on one event loop
+
+    start() opens the HTTP client pools and the embedding service and starts
+    the vector store maintenance; warmup() loads the models, the extraction
+    pool and the local vector index; close() releases all of it. The API
+    lifespan, the sync wrappers' background loop and the batch CLI all run
+    the pipeline through the same process-wide engine.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.warmup_error: Optional[str] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        await http_clients.start()
+        await embedding_service.start()
+        self._tasks = [asyncio.create_task(maintain_vector_store())]
+
+    async def warmup(self) -> bool:
+        """Load models and clients and run a dummy encode; returns whether the engine is ready"""
+        if self.ready:
+            return True
+        start_time = time.time()
+        try:
+            await asyncio.gather(
+                asyncio.to_thread(warmup_embedding),
+                asyncio.to_thread(warmup_expansion),
+                warmup_extract_pool()
+            )
+            # Needs the embedding dimension, so after the model is loaded
+            await asyncio.to_thread(get_vector_store)
+            embedding_cache = get_embedding_cache()
+            if embedding_cache is not None:
+                cache_stats.register("embedding", embedding_cache)
+        except Exception as e:
+            self.warmup_error = str(e)
+            print(f"Warmup failed: {str(e)}")
+            return False
+        self.ready = True
+        self.warmup_error = None
+        print(f"Warmup finished in {time.time() - start_time:.2f}s")
+        return True
+
+    async def close(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        # Let pending vector store writes land before the final snapshot
+        if background_tasks:
+            await asyncio.gather(*background_tasks, return_exceptions=True)
+        store = get_vector_store() if self.ready else None
+        if store is not None:
+            await asyncio.to_thread(store.snapshot)
+        self.ready = False
+        await asyncio.to_thread(expansion_cache.flush)
+        await embedding_service.close()
+        await http_clients.close()
+        shutdown_extract_pool()
+
+# Process-wide engine; started by the API lifespan, the background loop of
+# the sync wrappers (sync.py) or the batch CLI (cli.py)
+engine = SearchEngine()
@@ -0,0 +1,499 @@
+"""
+The search pipeline, shared by the API server, the sync wrappers and the
+batch CLI
+
+Every entry point here is async and expects the engine (engine.py) to be
+started on the running event loop; without it the shared HTTP pools and
+embedding service fall back to per-call resources.
+"""
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from brave_search.brave_search_function import cached_web_search, merge_search_results
+from web_page_parse.parse_web_function import iter_parse_web_pages
+from similiarity_search.stream_embed import stream_embed_pages
+from similiarity_search.embed_service import embedding_service
+from similiarity_search.hybrid import retrieve, retrieve_batch
+from similiarity_search.vector_store import get_vector_store
+from query_expand import async_expand_query
+from config.setting import (
+    SPECULATIVE_SEARCH, SPECULATIVE_GRACE_MS, VECTOR_STORE_WEB_TTL, VECTOR_STORE_NEWS_TTL, VECTOR_STORE_MIN_SCORE,
+    RETRIEVAL_MODE, FUSION_METHOD, EXPANSION_TIMEOUT, BRAVE_TIMEOUT, SEARCH_DEADLINE_MS,
+    EXPANSION_MIN_BUDGET_MS, DEADLINE_RESERVE_MS, PROGRESSIVE_RERANK_INTERVAL_MS
+)
+from utils.deadline import Deadline
+from utils.metrics import CACHE_LOOKUPS, DEADLINE_CUTOFFS, observe_stage
+
+# Share of a small deadline budget kept for embedding and ranking at most,
+# so budgets below DEADLINE_RESERVE_MS still leave time to fetch
+DEADLINE_RESERVE_FRACTION = 0.2
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+background_tasks = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def search_and_parse_async(query: str):
+    """Run a (cached) Brave search and parse it into (web_results, news_results)"""
+    return await cached_web_search(query)
+
+async def speculative_search(
+    query: str,
+    policy: str = SPECULATIVE_SEARCH,
+    verbose: bool = False,
+    deadline: Optional[Deadline] = None,
+    timings: Optional[Dict[str, float]] = None
+):
+    """
+    Expand the query and search the web, overlapping the two where possible
+
+    With policy "merge" or "discard" the raw query is sent to Brave while the
+    expansion is still running. Once the raw hits are in, the expanded search
+    gets at most SPECULATIVE_GRACE_MS more; if it is not done by then the raw
+    hits are used on their own, so a slow expansion costs at most the grace
+    period on top of the Brave call instead of a whole expansion round-trip.
+    Expanded hits that make it in time are merged with the raw hits
+    ("merge") or replace them ("discard").
+
+    Both calls are bounded by their timeouts and by the deadline. With less
+    than EXPANSION_MIN_BUDGET_MS left the query is not expanded, and an
+    expansion that fails or runs out of time falls back to the raw query. A
+    Brave call that runs out of time raises asyncio.TimeoutError. The seconds
+    the expansion took are stored in timings['expansion'] and those spent on
+    Brave (the longest call, as the calls may overlap) in timings['search']
+    if timings is given.
+
+    Returns:
+    - Tuple of (expanded_query, (web_results, news_results))
+    """
+    deadline = deadline or Deadline()
+    timings = {} if timings is None else timings
+    timings['expansion'] = timings['search'] = 0.0
+
+    async def search(q: str):
+        start_time = time.time()
+        try:
+            return await asyncio.wait_for(search_and_parse_async(q), deadline.timeout(BRAVE_TIMEOUT))
+        finally:
+            timings['search'] = max(timings['search'], time.time() - start_time)
+
+    async def expand() -> str:
+        start_time = time.time()
+        try:
+            with observe_stage("expansion"):
+                return await asyncio.wait_for(async_expand_query(query), deadline.timeout(EXPANSION_TIMEOUT))
+        except asyncio.TimeoutError:
+            if verbose:
+                print("Query expansion timed out, using the raw query")
+            DEADLINE_CUTOFFS.labels("expansion").inc()
+            raise
+        except Exception as e:
+            if verbose:
+                print(f"Query expansion failed, using the raw query: {str(e)}")
+            raise
+        finally:
+            timings['expansion'] = time.time() - start_time
+
+    if deadline.remaining() * 1000 < EXPANSION_MIN_BUDGET_MS:
+        if verbose:
+            print(f"Skipping query expansion, {deadline.remaining() * 1000:.0f} ms left")
+        DEADLINE_CUTOFFS.labels("expansion").inc()
+        return query, await search(query)
+
+    if policy not in ("merge", "discard"):
+        try:
+            expanded_query = await expand()
+        except Exception:
+            expanded_query = query
+        return expanded_query, await search(expanded_query)
+
+    async def expanded_search():
+        expanded_query = await expand()
+        return expanded_query, await search(expanded_query)
+
+    raw_task = asyncio.create_task(search(query))
+    expanded_task = asyncio.create_task(expanded_search())
+    try:
+        try:
+            raw_hits = await raw_task
+        except Exception as e:
+            # Without raw hits the expanded search is all there is
+            if verbose:
+                print(f"Raw query search failed: {str(e)}")
+            try:
+                return await expanded_task
+            except Exception:
+                raise e
+
+        done, _ = await asyncio.wait({expanded_task}, timeout=SPECULATIVE_GRACE_MS / 1000)
+        if not done:
+            if verbose:
+                print(f"Expanded search not done {SPECULATIVE_GRACE_MS:.0f} ms after the raw hits, using raw query results")
+            return query, raw_hits
+        try:
+            expanded_query, expanded_hits = expanded_task.result()
+        except Exception as e:
+            if verbose:
+                print(f"Expanded search failed, using raw query results: {str(e)}")
+            return query, raw_hits
+        if policy == "discard":
+            return expanded_query, expanded_hits
+        return expanded_query, merge_search_results(expanded_hits, raw_hits)
+    finally:
+        # Also reached when the caller is cancelled
+        for task in (raw_task, expanded_task):
+            task.cancel()
+
+async def answer_locally(store, query_vector, top_k: int, verbose: bool = False) -> Optional[List[Dict]]:
+    """
+    Results from the local vector index if it covers the query well enough,
+    else None
+
+    Hits are ranked by cosine similarity and are chunks of whatever size
+    they were stored with, so callers only use this for dense retrieval and
+    flag the answer with source 'local'.
+    """
+    local_hits = await asyncio.to_thread(store.search, query_vector, top_k)
+    if len(local_hits) < top_k or local_hits[-1].score < VECTOR_STORE_MIN_SCORE:
+        CACHE_LOOKUPS.labels("local_index", "miss").inc()
+        return None
+    CACHE_LOOKUPS.labels("local_index", "hit").inc()
+    if verbose:
+        print(f"Answered from local index (lowest score {local_hits[-1].score:.3f})")
+    return [
+        {'text': hit.text, 'url': hit.url, 'urls': [hit.url], 'score': hit.score}
+        for hit in local_hits
+    ]
+
+async def parse_pages_until(urls: List[str], deadline: Deadline, arrived: List[str]):
+    """
+    Parse pages until DEADLINE_RESERVE_MS (at most a fifth of the budget)
+    before the deadline, leaving that time to embed and rank what arrived;
+    (url, parse_time, whether it produced text) of every parsed page is
+    appended to `arrived`
+    """
+    reserve = DEADLINE_RESERVE_MS / 1000
+    if deadline.budget is not None:
+        reserve = min(reserve, DEADLINE_RESERVE_FRACTION * deadline.budget)
+    async for page in iter_parse_web_pages(urls, deadline.reserve(reserve)):
+        arrived.append((page[0], page[2], bool(page[1] and page[1].strip())))
+        yield page
+
+async def collect_chunks(urls: List[str], chunk_size: int, chunk_overlap: int, deadline: Optional[Deadline] = None):
+    """
+    Parse pages, chunk and embed each one as soon as it is extracted
+
+    Returns:
+    - Tuple of (chunks, source URL list per chunk, vectors or None if no
+      chunks, whether the deadline cut off some pages)
+    """
+    text_list, url_list, vector_parts, arrived = [], [], [], []
+    pages = parse_pages_until(urls, deadline or Deadline(), arrived)
+    async for chunks, chunk_urls, vectors in stream_embed_pages(pages, chunk_size, chunk_overlap):
+        text_list.extend(chunks)
+        url_list.extend(chunk_urls)
+        vector_parts.append(vectors)
+    vectors = np.vstack(vector_parts) if vector_parts else None
+    return text_list, url_list, vectors, len(arrived) < len(urls)
+
+class ChunkMatrix:
+    """
+    Chunk vectors appended batch by batch
+
+    The buffer doubles when full, so the matrix of everything embedded so
+    far is available as a view after every batch without re-stacking all
+    earlier batches.
+    """
+
+    def __init__(self):
+        self._buffer: Optional[np.ndarray] = None
+        self.size = 0
+
+    def append(self, vectors: np.ndarray) -> None:
+        needed = self.size + len(vectors)
+        if self._buffer is None or needed > len(self._buffer):
+            capacity = max(needed, 2 * (0 if self._buffer is None else len(self._buffer)), 64)
+            buffer = np.empty((capacity, vectors.shape[1]), dtype=vectors.dtype)
+            if self._buffer is not None:
+                buffer[:self.size] = self._buffer[:self.size]
+            self._buffer = buffer
+        self._buffer[self.size:needed] = vectors
+        self.size = needed
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._buffer[:self.size]
+
+def remember_chunks(store, text_list: List[str], url_list: List[List[str]], vectors, news_urls: set):
+    """Keep everything we embedded for later queries (news expires sooner)"""
+    if store is None:
+        return
+    primary_urls = [urls[0] for urls in url_list]
+    ttls = [VECTOR_STORE_NEWS_TTL if url in news_urls else VECTOR_STORE_WEB_TTL for url in primary_urls]
+    run_in_background(asyncio.to_thread(store.add, text_list, primary_urls, vectors, ttls))
+
+def format_hits(top_hits, text_list: List[str], url_list: List[List[str]]) -> List[Dict]:
+    return [
+        {'text': text_list[idx], 'url': url_list[idx][0], 'urls': url_list[idx], 'score': score}
+        for idx, score in top_hits
+    ]
+
+async def search_events(
+    query: str,
+    top_k: int = 5,
+    chunk_size: int = 256,
+    chunk_overlap: int = 50,
+    verbose: bool = False,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    fusion: str = FUSION_METHOD,
+    progressive: bool = True,
+    deadline_ms: Optional[float] = None
+):
+    """
+    Run the search pipeline, yielding events as each stage produces output
+
+    With a deadline (deadline_ms, else SEARCH_DEADLINE_MS) every stage only
+    uses the time left: expansion may be skipped, pages still in flight are
+    cancelled and the top-k is ranked over the pages that arrived.
+
+    Every event is a dict {'event': name, 'data': payload}:
+    - stage: {'stage', 'elapsed'} when a stage starts
+    - expanded_query: {'query', 'expansion_time', 'search_time'} the latter
+      two in seconds (see speculative_search)
+    - brave_hits: {'web', 'news'} Brave results (title, url, description)
+    - top_k: {'results', 'chunks'} current best chunks, re-ranked after an
+      embedded batch at most every PROGRESSIVE_RERANK_INTERVAL_MS (only when
+      progressive and the ranking changed)
+    - fetched: {'urls', 'pages', 'parse_times', 'chunks'} once fetching
+      ends: URLs requested, pages that arrived, the parse seconds of every
+      page that produced text and the number of chunks
+    - result: {'results', 'source', 'partial'} the final answer, always the
+      last event; partial is set when the deadline cut the search short
+    """
+    start_time = time.time()
+    deadline = Deadline.from_ms(deadline_ms or SEARCH_DEADLINE_MS)
+
+    def stage(name: str) -> Dict:
+        return {'event': 'stage', 'data': {'stage': name, 'elapsed': time.time() - start_time}}
+
+    # The query embedding does not depend on anything else, start it right away
+    query_vector_task = asyncio.create_task(embedding_service.embed([query]))
+    try:
+        # 0. Answer from the local index of previously fetched chunks when it
+        #    covers the query well enough; this skips expansion and the web.
+        #    The index is ranked by cosine only, so bm25 and hybrid requests
+        #    always go to the web
+        store = await asyncio.to_thread(get_vector_store)
+        if store is not None and retrieval_mode == "dense":
+            yield stage('local_index')
+            local_results = await answer_locally(store, (await query_vector_task)[0], top_k, verbose)
+            if local_results is not None:
+                yield {'event': 'result', 'data': {'results': local_results, 'source': 'local', 'partial': False}}
+                return
+        
+        # 1-2. Query expansion and web search (raw query runs speculatively)
+        yield stage('search')
+        timings = {}
+        try:
+            expanded_query, (web_results, news_results) = await speculative_search(
+                query, verbose=verbose, deadline=deadline, timings=timings
+            )
+        except asyncio.TimeoutError:
+            if verbose:
+                print("Web search ran out of time")
+            DEADLINE_CUTOFFS.labels("brave").inc()
+            yield {'event': 'result', 'data': {'results': [], 'source': None, 'partial': True}}
+            return
+        yield {'event': 'expanded_query', 'data': {
+            'query': expanded_query, 'expansion_time': timings['expansion'], 'search_time': timings['search']
+        }}
+        yield {'event': 'brave_hits', 'data': {'web': web_results, 'news': news_results}}
+        
+        if verbose:
+            print(f"Expanded query: {expanded_query}")
+            print(f"Found {len(web_results)} web results and {len(news_results)} news results")
+        
+        # 3. Collect URLs
+        urls = [i['url'] for i in web_results + news_results]
+        if verbose:
+            print(f"Processing {len(urls)} URLs...")
+        
+        # 4-5. Parse pages, chunk and embed each one as soon as it is extracted,
+        #      periodically re-ranking what has arrived so far
+        yield stage('fetch')
+        text_list, url_list, arrived = [], [], []
+        matrix = ChunkMatrix()
+        current, last_rerank = None, -float('inf')
+        pages = parse_pages_until(urls, deadline, arrived)
+        async for chunks, chunk_urls, vectors in stream_embed_pages(pages, chunk_size, chunk_overlap):
+            text_list.extend(chunks)
+            url_list.extend(chunk_urls)
+            matrix.append(vectors)
+            if progressive and (time.monotonic() - last_rerank) * 1000 >= PROGRESSIVE_RERANK_INTERVAL_MS:
+                query_vector = (await query_vector_task)[0]
+                top_hits = await asyncio.to_thread(
+                    retrieve, query, query_vector, text_list, matrix.vectors,
+                    top_k, retrieval_mode, fusion
+                )
+                last_rerank = time.monotonic()
+                if [idx for idx, _ in top_hits] != current:
+                    current = [idx for idx, _ in top_hits]
+                    yield {'event': 'top_k', 'data': {
+                        'results': format_hits(top_hits, text_list, url_list), 'chunks': len(text_list)
+                    }}
+        yield {'event': 'fetched', 'data': {
+            'urls': len(urls), 'pages': len(arrived),
+            'parse_times': [parse_time for _, parse_time, has_text in arrived if has_text], 'chunks': len(text_list)
+        }}
+        
+        # 6. Search
+        yield stage('retrieval')
+        partial = len(arrived) < len(urls)
+        if not text_list:
+            yield {'event': 'result', 'data': {'results': [], 'source': None, 'partial': partial}}
+            return
+            
+        vectors = matrix.vectors
+        query_vector = (await query_vector_task)[0]
+        with observe_stage("retrieval"):
+            top_hits = await asyncio.to_thread(
+                retrieve, query, query_vector, text_list, vectors, top_k, retrieval_mode, fusion
+            )
+        remember_chunks(store, text_list, url_list, vectors, {i['url'] for i in news_results})
+        
+        # 7. Prepare results
+        yield {'event': 'result', 'data': {
+            'results': format_hits(top_hits, text_list, url_list), 'source': 'web', 'partial': partial
+        }}
+        
+    finally:
+        query_vector_task.cancel()
+
+async def async_search_pipeline(
+    query: str,
+    top_k: int = 5,
+    chunk_size: int = 256,
+    chunk_overlap: int = 50,
+    verbose: bool = False,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    fusion: str = FUSION_METHOD,
+    deadline_ms: Optional[float] = None
+):
+    """
+    Asynchronous search pipeline implementation: search_events without the
+    progressive events
+
+    Returns:
+    - Tuple of (results, meta), meta holding 'source' ('local' or 'web') and
+      'partial' when they apply
+    """
+    events = search_events(
+        query, top_k, chunk_size, chunk_overlap, verbose, retrieval_mode, fusion,
+        progressive=False, deadline_ms=deadline_ms
+    )
+    async with aclosing(events):
+        async for event in events:
+            if event['event'] == 'result':
+                result = event['data']
+                meta = {'source': result['source']} if result['source'] else {}
+                if result['partial']:
+                    meta['partial'] = True
+                return result['results'], meta
+
+async def async_batch_search_pipeline(
+    queries: List[str],
+    top_k: int = 5,
+    chunk_size: int = 256,
+    chunk_overlap: int = 50,
+    verbose: bool = False,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    fusion: str = FUSION_METHOD,
+    deadline_ms: Optional[float] = None
+) -> List[Dict]:
+    """
+    Search pipeline for several related queries sharing one fetch/embed pass
+
+    Expansion and Brave calls run concurrently for all queries. The union of
+    their URLs is fetched, chunked and embedded once, and every query is
+    scored against the shared chunk matrix in one matrix multiply, so cost
+    grows with the amount of unique content rather than the query count.
+
+    The deadline (deadline_ms, else SEARCH_DEADLINE_MS) covers the whole
+    batch, as in search_events.
+
+    Returns:
+    - One dict per query with query, results, source, error (if its web
+      search failed) and partial
+    """
+    deadline = Deadline.from_ms(deadline_ms or SEARCH_DEADLINE_MS)
+    query_vectors = await embedding_service.embed(queries)
+    answers = [
+        {'query': query, 'results': [], 'source': 'web', 'error': None, 'partial': False}
+        for query in queries
+    ]
+
+    # 0. Queries the local index already covers skip the web entirely (dense
+    #    mode only, as in search_events)
+    store = await asyncio.to_thread(get_vector_store)
+    if store is not None and retrieval_mode == "dense":
+        local_results = await asyncio.gather(
+            *(answer_locally(store, vector, top_k, verbose) for vector in query_vectors)
+        )
+        for answer, results in zip(answers, local_results):
+            if results is not None:
+                answer.update(results=results, source='local')
+    pending = [i for i, answer in enumerate(answers) if answer['source'] == 'web']
+    if not pending:
+        return answers
+
+    # 1-2. Expansion and web search for all remaining queries at once;
+    #      one failing query does not fail the batch
+    searches = await asyncio.gather(
+        *(speculative_search(queries[i], verbose=verbose, deadline=deadline) for i in pending),
+        return_exceptions=True
+    )
+    urls, news_urls = {}, set()
+    for i, search in zip(pending, searches):
+        if isinstance(search, asyncio.TimeoutError):
+            DEADLINE_CUTOFFS.labels("brave").inc()
+            answers[i].update(error="Web search ran out of time", partial=True)
+            continue
+        if isinstance(search, Exception):
+            answers[i]['error'] = str(search)
+            continue
+        _, (web_results, news_results) = search
+        urls.update((item['url'], None) for item in web_results + news_results)
+        news_urls.update(item['url'] for item in news_results)
+    if verbose:
+        print(f"Processing {len(urls)} unique URLs for {len(pending)} queries...")
+
+    # 3-5. Parse, chunk and embed the union of URLs once
+    text_list, url_list, vectors, cut_off = await collect_chunks(list(urls), chunk_size, chunk_overlap, deadline)
+    scored = [i for i in pending if answers[i]['error'] is None]
+    for i in scored:
+        answers[i]['partial'] = cut_off
+    if not text_list:
+        return answers
+
+    # 6. Score every query against the shared matrix
+    with observe_stage("retrieval"):
+        top_hits = await asyncio.to_thread(
+            retrieve_batch, [queries[i] for i in scored], query_vectors[scored],
+            text_list, vectors, top_k, retrieval_mode, fusion
+        )
+    remember_chunks(store, text_list, url_list, vectors, news_urls)
+
+    for i, hits in zip(scored, top_hits):
+        answers[i]['results'] = format_hits(hits, text_list, url_list)
+    return answers
@@ -0,0 +1,104 @@
+import threading
+import time
+from contextlib import aclosing
+from typing import Dict, List, Optional, Tuple
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import RETRIEVAL_MODE, FUSION_METHOD
+from search_engine.engine import engine
+from search_engine.pipeline import search_events
+from utils.background_loop import background_loop, run_sync
+
+# Stage events of search_events -> stats keys of the synchronous pipeline
+STAGE_STATS = {
+    'local_index': 'local_index_time',
+    'search': 'web_search_time',
+    'fetch': 'web_parse_time',
+    'retrieval': 'vector_search_time',
+}
+
+_engine_lock = threading.Lock()
+
+def ensure_engine() -> None:
+    """Start and warm up the engine on the background loop once; it is closed with the loop at exit"""
+    if engine.started:
+        return
+    with _engine_lock:
+        if not engine.started:
+            run_sync(engine.start())
+            background_loop.on_close(engine.close)
+            # A failed warmup is logged; the pipeline then loads lazily
+            run_sync(engine.warmup())
+
+async def timed_search(query: str, **options) -> Tuple[List[Dict], Dict[str, float]]:
+    """
+    Run search_events to completion, timing each stage from its stage events
+
+    Also fills in the expansion time, the per-page parse time statistics
+    and the chunk count the synchronous pipeline always reported, computed
+    as it did: web_search_time is the Brave call alone (query expansion is
+    query_expansion_time), the parse times only cover pages that produced
+    text and avg_parse_time divides by the number of URLs.
+    """
+    start_time = time.time()
+    stats, results = {}, []
+    current, current_start = None, 0.0
+    search_time = None
+    events = search_events(query, progressive=False, **options)
+    async with aclosing(events):
+        async for event in events:
+            if event['event'] == 'stage':
+                if current is not None:
+                    stats[STAGE_STATS[current]] = event['data']['elapsed'] - current_start
+                current, current_start = event['data']['stage'], event['data']['elapsed']
+            elif event['event'] == 'expanded_query':
+                stats['query_expansion_time'] = event['data']['expansion_time']
+                search_time = event['data']['search_time']
+            elif event['event'] == 'fetched':
+                parse_times = event['data']['parse_times']
+                stats['total_parse_time'] = sum(parse_times)
+                stats['max_parse_time'] = max(parse_times, default=0.0)
+                stats['min_parse_time'] = min(parse_times, default=0.0)
+                urls = event['data']['urls']
+                stats['avg_parse_time'] = stats['total_parse_time'] / urls if urls else 0
+                stats['total_chunks'] = event['data']['chunks']
+            elif event['event'] == 'result':
+                results = event['data']['results']
+    total = time.time() - start_time
+    if current is not None:
+        stats[STAGE_STATS[current]] = total - current_start
+    if search_time is not None:
+        stats['web_search_time'] = search_time
+    stats['total_time'] = total
+    return results, stats
+
+def search_pipeline(
+    query: str,
+    top_k: int = 5,
+    chunk_size: int = 256,
+    chunk_overlap: int = 50,
+    verbose: bool = False,
+    retrieval_mode: str = RETRIEVAL_MODE,
+    fusion: str = FUSION_METHOD,
+    deadline_ms: Optional[float] = None
+) -> Tuple[List[Dict], Dict[str, float]]:
+    """
+    Blocking search for scripts and notebooks
+
+    Runs the same pipeline as the API on the process-wide background loop,
+    so HTTP pools, caches and the embedding service are reused across calls
+    (and across threads calling concurrently).
+
+    Returns:
+    - Tuple of (results, stats): results as in async_search_pipeline, stats
+      the seconds spent in each stage plus total_time, query_expansion_time,
+      the page parse times (total/max/min/avg_parse_time) and total_chunks
+      for the stages that ran
+    """
+    ensure_engine()
+    return run_sync(timed_search(
+        query, top_k=top_k, chunk_size=chunk_size, chunk_overlap=chunk_overlap, verbose=verbose,
+        retrieval_mode=retrieval_mode, fusion=fusion, deadline_ms=deadline_ms
+    ))
@@ -0,0 +1,106 @@
+"""
+Compare embedding backends for agreement and throughput
+
+Usage:
+    python -m similiarity_search.backend_parity --backends torch onnx int8
+    python -m similiarity_search.backend_parity --texts-file chunks.txt --json report.json
+
+The first backend is the reference: for every other backend the per-text
+cosine similarity to the reference vectors is reported (mean / min / p5),
+together with encode throughput for each backend.
+"""
+import argparse
+import json
+import time
+from typing import Dict, List
+
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import EMBEDDING_MODEL
+from similiarity_search.embed_backends import BACKENDS, load_backend
+
+SAMPLE_TEXTS = [
+    "Regulators pointed out serious problems in Silicon Valley Bank's risk management.",
+    "In March 2023, Silicon Valley Bank experienced a bank run due to a liquidity crisis.",
+    "The Federal Reserve raised interest rates by 25 basis points on Wednesday.",
+    "A Chinese destroyer conducted live-fire drills off the coast of Australia.",
+    "Check system logs for abnormal records and update server security patches.",
+    "Optimize database queries to improve response speed for end users.",
+    "The championship final drew a record television audience of 30 million viewers.",
+    "Researchers reported a new battery chemistry with twice the energy density.",
+]
+
+def sample_corpus(size: int) -> List[str]:
+    """Build a corpus of roughly chunk-sized texts from the sample sentences"""
+    texts = []
+    for i in range(size):
+        sentences = [SAMPLE_TEXTS[(i + j) % len(SAMPLE_TEXTS)] for j in range(1 + i % 12)]
+        texts.append(f"[{i}] " + " ".join(sentences))
+    return texts
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def compare_backends(names: List[str], texts: List[str], batch_size: int = 32, model_name: str = EMBEDDING_MODEL) -> Dict:
+    report = {"model": model_name, "texts": len(texts), "backends": {}}
+    reference = None
+    for name in names:
+        backend = load_backend(name, model_name)
+        backend.encode(texts[:batch_size], batch_size=batch_size)  # warm up
+        start = time.perf_counter()
+        vectors = _normalize(np.asarray(backend.encode(texts, batch_size=batch_size), dtype=np.float32))
+        elapsed = time.perf_counter() - start
+
+        result = {"seconds": elapsed, "texts_per_second": len(texts) / elapsed}
+        if reference is None:
+            reference = vectors
+        else:
+            cosine = np.sum(reference * vectors, axis=1)
+            result.update({
+                "cosine_mean": float(cosine.mean()),
+                "cosine_min": float(cosine.min()),
+                "cosine_p5": float(np.percentile(cosine, 5)),
+            })
+        report["backends"][name] = result
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend parity and throughput check")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS),
+                        help="Backends to compare, the first one is the reference")
+    parser.add_argument("--model", default=EMBEDDING_MODEL)
+    parser.add_argument("--texts", type=int, default=512, help="Size of the generated sample corpus")
+    parser.add_argument("--texts-file", help="Use texts from this file instead (one per line)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    if args.texts_file:
+        with open(args.texts_file, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = sample_corpus(args.texts)
+
+    report = compare_backends(args.backends, texts, args.batch_size, args.model)
+
+    reference = args.backends[0]
+    print(f"Model: {report['model']}  texts: {report['texts']}  reference: {reference}")
+    print(f"{'backend':<8} {'texts/s':>10} {'speedup':>8} {'cos mean':>9} {'cos min':>9} {'cos p5':>9}")
+    base_rate = report["backends"][reference]["texts_per_second"]
+    for name, result in report["backends"].items():
+        print(
+            f"{name:<8} {result['texts_per_second']:>10.1f} {result['texts_per_second'] / base_rate:>7.2f}x"
+            f" {result.get('cosine_mean', 1.0):>9.4f} {result.get('cosine_min', 1.0):>9.4f}"
+            f" {result.get('cosine_p5', 1.0):>9.4f}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
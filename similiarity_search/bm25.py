@@ -0,0 +1,62 @@
+import re
+from typing import List, Sequence
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    小写化后按单词切分（保留数字，便于匹配日期、数量等精确信息）
+    """
+    return TOKEN_RE.findall(text.lower())
+
+class BM25Index:
+    """
+    基于稀疏矩阵的向量化 BM25 打分器
+
+    构建时把所有文本块编码为 (文本块 × 词表) 的 CSR 词频矩阵；
+    打分时只取查询词对应的列，一次性算出所有文本块的分数。
+    同一组文本块可以对多个查询重复使用。
+    """
+
+    def __init__(self, docs: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        indices = []
+        indptr = [0]
+        for doc in docs:
+            for token in tokenize(doc):
+                indices.append(self.vocab.setdefault(token, len(self.vocab)))
+            indptr.append(len(indices))
+
+        self.n_docs = len(docs)
+        data = np.ones(len(indices), dtype=np.float32)
+        self.tf = csr_matrix(
+            (data, np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+            shape=(self.n_docs, len(self.vocab))
+        )
+        self.tf.sum_duplicates()
+
+        doc_len = np.diff(np.array(indptr, dtype=np.int64)).astype(np.float32)
+        avg_len = doc_len.mean() if self.n_docs else 0.0
+        # 每个文本块的长度归一化项 k1 * (1 - b + b * |d| / avgdl)
+        self.length_norm = k1 * (1 - b + b * doc_len / max(avg_len, 1e-9))
+        df = np.bincount(self.tf.indices, minlength=len(self.vocab)).astype(np.float32)
+        self.idf = np.log1p((self.n_docs - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> np.ndarray:
+        """
+        返回查询对每个文本块的 BM25 分数（float32，长度为文本块数）
+        """
+        term_ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        if not term_ids or self.n_docs == 0:
+            return np.zeros(self.n_docs, dtype=np.float32)
+
+        sub = self.tf[:, term_ids]
+        rows = np.repeat(np.arange(self.n_docs), np.diff(sub.indptr))
+        tf = sub.data
+        weights = self.idf[term_ids][sub.indices] * tf * (self.k1 + 1) / (tf + self.length_norm[rows])
+        return np.bincount(rows, weights=weights, minlength=self.n_docs).astype(np.float32)
@@ -1,5 +1,6 @@
 import re
-from typing import List
+from array import array
+from typing import List, Tuple
 
 def split_text_into_words(text: str) -> List[str]:
     """
@@ -63,4 +64,61 @@ def chunk_split(text: str, chunk_size: int = 256, overlap: int = 50) -> List[str
     
     return chunks
 
+WORD_RE = re.compile(r"\S+")
 
+def _window_spans(starts, ends, chunk_size: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    按单元（单词或 token）的起止偏移生成重叠窗口的字符区间
+    """
+    count = len(starts)
+    step = max(1, chunk_size - overlap)
+    spans = []
+    start = 0
+    while start < count:
+        end = min(start + chunk_size, count)
+        spans.append((starts[start], ends[end - 1]))
+        if end == count:
+            break
+        start += step
+    return spans
+
+def chunk_spans(
+    text: str,
+    chunk_size: int = 256,
+    overlap: int = 50,
+    tokenizer=None
+) -> List[Tuple[int, int]]:
+    """
+    将文本分割成重叠的块，只返回每块在原文中的 (start, end) 字符区间
+
+    默认按单词计数：只做一次正则扫描记录单词偏移，不生成单词列表和中间字符串。
+    传入 tokenizer（需支持 return_offsets_mapping 的 fast tokenizer）时按模型 token 计数，
+    使每块正好落在模型的输入长度限制内。需要文本时再用 text[start:end] 切片。
+
+    Args:
+        text: 要分割的文本
+        chunk_size: 每个块的单词（或 token）数量
+        overlap: 块之间重叠的单词（或 token）数量
+        tokenizer: 可选，按 token 计数时使用的分词器
+
+    Returns:
+        (start, end) 字符区间列表
+    """
+    if tokenizer is None:
+        starts = array('l')
+        ends = array('l')
+        for match in WORD_RE.finditer(text):
+            starts.append(match.start())
+            ends.append(match.end())
+    else:
+        offsets = tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False
+        )["offset_mapping"]
+        starts = array('l', (start for start, _ in offsets))
+        ends = array('l', (end for _, end in offsets))
+    return _window_spans(starts, ends, chunk_size, overlap)
@@ -0,0 +1,98 @@
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_BANDS
+from similiarity_search.bm25 import tokenize
+
+# Mersenne-style prime just below 2**32: with 32-bit shingle hashes and
+# coefficients below it, a * x + b stays inside uint64 without overflow
+_PRIME = np.uint64((1 << 32) - 5)
+_MASK = (1 << 32) - 1
+
+def _permutations(num_perm: int, seed: int = 1):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+    return a, b
+
+def shingle_hashes(text: str, size: int = 3) -> np.ndarray:
+    """
+    32-bit hashes of the word `size`-grams of text (lowercased, punctuation
+    dropped). Uses the built-in str hash, so values are only comparable
+    within one process.
+    """
+    words = tokenize(text)
+    if len(words) < size:
+        shingles = {" ".join(words)} if words else set()
+    else:
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((hash(s) & _MASK for s in shingles), dtype=np.uint64, count=len(shingles))
+
+class MinHasher:
+    """MinHash signatures: one min over (a * x + b) mod p per permutation"""
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, shingle_size: int = 3):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a, self._b = _permutations(num_perm)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Signature of text, or None if it has no words"""
+        hashes = shingle_hashes(text, self.shingle_size)
+        if len(hashes) == 0:
+            return None
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+class NearDuplicateIndex:
+    """
+    LSH index over MinHash signatures
+
+    Signatures are cut into `bands` bands; items sharing any band bucket are
+    candidates, and a candidate is a near duplicate when the estimated
+    Jaccard similarity (share of equal signature slots) reaches threshold.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM, bands: int = DEDUP_BANDS):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self._rows = num_perm // bands
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self._rows:(band + 1) * self._rows].tobytes()
+
+    def query(self, signature: np.ndarray) -> Optional[Hashable]:
+        """Key of the most similar indexed item at or above threshold, if any"""
+        best, best_score = None, self.threshold
+        checked = set()
+        for band, band_key in self._band_keys(signature):
+            for key in self._buckets[band].get(band_key, ()):
+                if key in checked:
+                    continue
+                checked.add(key)
+                score = float(np.mean(self._signatures[key] == signature))
+                if score >= best_score:
+                    best, best_score = key, score
+        return best
+
+    def add(self, key: Hashable, signature: np.ndarray) -> None:
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def match_or_add(self, key: Hashable, signature: Optional[np.ndarray]) -> Optional[Hashable]:
+        """Return the key of a near duplicate, or index this item and return None"""
+        if signature is None:
+            return None
+        match = self.query(signature)
+        if match is None:
+            self.add(key, signature)
+        return match
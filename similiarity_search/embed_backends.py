@@ -0,0 +1,80 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Type
+
+import numpy as np
+
+class EmbeddingBackend(ABC):
+    """
+    Sentence embedding backend
+
+    Subclasses load a sentence-transformers model in a particular runtime
+    and expose the same encode/tokenizer interface, so the rest of the
+    pipeline does not care which one is configured.
+    """
+
+    name = ""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.model = self._load()
+
+    @abstractmethod
+    def _load(self):
+        """Load and return the sentence-transformers model"""
+
+    def encode(self, texts, batch_size: int = 32) -> np.ndarray:
+        """Embed a text or a list of texts as L2-normalized float32 numpy arrays"""
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    @property
+    def max_seq_length(self) -> int:
+        return self.model.max_seq_length
+
+    @property
+    def dim(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+class TorchBackend(EmbeddingBackend):
+    """The reference PyTorch (fp32) runtime"""
+
+    name = "torch"
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name)
+
+class OnnxBackend(EmbeddingBackend):
+    """ONNX Runtime; needs `optimum[onnxruntime]` (the model is exported on first load)"""
+
+    name = "onnx"
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(self.model_name, backend="onnx")
+
+class Int8Backend(EmbeddingBackend):
+    """PyTorch with the Linear layers dynamically quantized to int8"""
+
+    name = "int8"
+
+    def _load(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(self.model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    backend.name: backend for backend in (TorchBackend, OnnxBackend, Int8Backend)
+}
+
+def load_backend(name: str, model_name: str) -> EmbeddingBackend:
+    """Instantiate the embedding backend registered under name"""
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown embedding backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return backend(model_name)
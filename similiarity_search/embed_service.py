@@ -0,0 +1,140 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import EMBED_SERVICE_MAX_BATCH, EMBED_MAX_WAIT_MS
+from similiarity_search.ss_aml import embed_texts, to_numpy
+
+class EmbeddingService:
+    """
+    In-process embedding queue that micro-batches across requests
+
+    Concurrent embed() calls are merged into one model call of up to
+    max_batch texts. The worker collects whatever is queued, waits at most
+    max_wait_ms for more, runs the batch on a dedicated thread and scatters
+    the rows back to the callers. Identical texts within a batch are only
+    embedded once.
+    """
+
+    def __init__(self, max_batch: int = EMBED_SERVICE_MAX_BATCH, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._carry: Optional[Tuple[Sequence[str], asyncio.Future]] = None
+        # Batch taken off the queue by the worker and not yet answered
+        self._inflight: List[Tuple[Sequence[str], asyncio.Future]] = []
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def running(self) -> bool:
+        try:
+            return self._worker is not None and asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def start(self) -> None:
+        if self._worker is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self._worker = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        worker.cancel()
+        try:
+            await worker
+        except asyncio.CancelledError:
+            pass
+        pending = self._inflight + ([self._carry] if self._carry else [])
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding service stopped"))
+        self._carry = None
+        self._inflight = []
+        self._executor.shutdown(wait=False)
+
+    async def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Embed texts, batched together with other concurrent callers
+
+        Falls back to a direct threaded call when the service is not running
+        on the current event loop (scripts, sync wrappers).
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if not self.running:
+            return to_numpy(await asyncio.to_thread(embed_texts, list(texts)))
+        future = self._loop.create_future()
+        self._queue.put_nowait((texts, future))
+        return await future
+
+    def _drain(self, batch: List, size: int) -> int:
+        """Move queued requests into batch until it is full"""
+        while size < self.max_batch:
+            if self._carry is not None:
+                item, self._carry = self._carry, None
+            elif not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                break
+            if size + len(item[0]) > self.max_batch:
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return size
+
+    async def _next_batch(self) -> List[Tuple[Sequence[str], asyncio.Future]]:
+        if self._carry is not None:
+            batch = [self._carry]
+            self._carry = None
+        else:
+            batch = [await self._queue.get()]
+        # Visible to close() while waiting for more requests below
+        self._inflight = batch
+        size = self._drain(batch, len(batch[0][0]))
+        if size < self.max_batch and self.max_wait > 0:
+            await asyncio.sleep(self.max_wait)
+            self._drain(batch, size)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = [item for item in await self._next_batch() if not item[1].done()]
+            self._inflight = batch
+            if not batch:
+                continue
+
+            unique = {}
+            for texts, _ in batch:
+                for text in texts:
+                    unique.setdefault(text, len(unique))
+            try:
+                vectors = to_numpy(await self._loop.run_in_executor(self._executor, embed_texts, list(unique)))
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._inflight = []
+                continue
+
+            for texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[[unique[text] for text in texts]])
+            self._inflight = []
+
+# Shared by every request in the process; started by the API lifespan
+embedding_service = EmbeddingService()
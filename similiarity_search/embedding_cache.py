@@ -0,0 +1,131 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Callable, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within the process
+    fcntl = None
+
+KEY_SIZE = 16
+# Bumped whenever stored vectors change meaning, so older files are not read.
+# 2: vectors are L2-normalized (version 1 files held raw model outputs)
+FORMAT_VERSION = 2
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by a hash of (model name, chunk text)
+
+    Vectors live in an append-only float32 file that is memory-mapped for
+    reads; a companion file holds the 16-byte key of every row in the same
+    order and is loaded into a dict on start-up. Both files are appended
+    under an exclusive file lock, so rows and keys stay aligned even when
+    several worker processes share the directory. File names include
+    FORMAT_VERSION, so a format change starts a fresh cache rather than
+    serving vectors written under the old one.
+    """
+
+    def __init__(self, directory: str, model_name: str, dim: int):
+        self.model_name = model_name
+        self.dim = dim
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)}-{dim}-v{FORMAT_VERSION}")
+        self._vectors_path = base + ".f32"
+        self._keys_path = base + ".keys"
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._mmap: Optional[np.memmap] = None
+        self._load()
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dim * 4
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.model_name}\0{text}".encode("utf-8"), digest_size=KEY_SIZE).digest()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._keys_path) or not os.path.exists(self._vectors_path):
+            return
+        with open(self._keys_path, "rb") as f:
+            keys = f.read()
+        # Ignore a torn tail left by a crash between the two appends
+        rows = min(len(keys) // KEY_SIZE, os.path.getsize(self._vectors_path) // self.row_bytes)
+        for row in range(rows):
+            self._rows[keys[row * KEY_SIZE:(row + 1) * KEY_SIZE]] = row
+
+    def _vectors(self, min_rows: int) -> np.memmap:
+        """Memory map covering at least min_rows rows, remapped after appends"""
+        if self._mmap is None or self._mmap.shape[0] < min_rows:
+            rows = os.path.getsize(self._vectors_path) // self.row_bytes
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Zero-copy view of the cached vector for text, or None"""
+        with self._lock:
+            row = self._rows.get(self.key(text))
+            if row is None:
+                return None
+            return self._vectors(row + 1)[row]
+
+    def add(self, texts: List[str], vectors: np.ndarray) -> None:
+        """Append vectors for texts to the cache"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
+        keys = [self.key(text) for text in texts]
+        with self._lock:
+            with open(self._vectors_path, "ab") as vf, open(self._keys_path, "ab") as kf:
+                if fcntl is not None:
+                    fcntl.flock(kf, fcntl.LOCK_EX)
+                try:
+                    # Drop any torn tail so that row i of both files stays aligned
+                    first_row = min(kf.seek(0, os.SEEK_END) // KEY_SIZE, vf.seek(0, os.SEEK_END) // self.row_bytes)
+                    kf.truncate(first_row * KEY_SIZE)
+                    vf.truncate(first_row * self.row_bytes)
+                    vf.write(vectors.tobytes())
+                    vf.flush()
+                    kf.write(b"".join(keys))
+                    kf.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(kf, fcntl.LOCK_UN)
+            for offset, key in enumerate(keys):
+                self._rows[key] = first_row + offset
+
+    def encode(self, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Embed texts, calling encode() only for the cache misses
+
+        Returns:
+            np.ndarray: float32 matrix of shape (len(texts), dim) in input order
+        """
+        result = np.empty((len(texts), self.dim), dtype=np.float32)
+        missing = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                row = self._rows.get(self.key(text))
+                if row is None:
+                    missing.setdefault(text, []).append(i)
+                else:
+                    result[i] = self._vectors(row + 1)[row]
+        # Both counted per position, so repeated texts in a batch do not skew the hit rate
+        missed = sum(len(positions) for positions in missing.values())
+        self.hits += len(texts) - missed
+        self.misses += missed
+
+        if missing:
+            new_texts = list(missing)
+            new_vectors = np.asarray(encode(new_texts), dtype=np.float32)
+            self.add(new_texts, new_vectors)
+            for text, vector in zip(new_texts, new_vectors):
+                result[missing[text]] = vector
+        return result
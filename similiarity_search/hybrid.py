@@ -0,0 +1,114 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.stats import rankdata
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import RRF_K, HYBRID_ALPHA
+from similiarity_search.bm25 import BM25Index
+from similiarity_search.ss_faiss import as_float32, top_k_search, batch_top_k_search, _top_k_indices
+
+RETRIEVAL_MODES = ("dense", "bm25", "hybrid")
+FUSION_METHODS = ("rrf", "weighted")
+
+def _ranks(scores: np.ndarray) -> np.ndarray:
+    """
+    每个元素按分数降序的名次（从 0 开始），分数相同的元素名次相同，
+    避免融合时仅因位置靠前而占优
+    """
+    return (rankdata(-scores, method='min') - 1).astype(np.int64)
+
+def reciprocal_rank_fusion(dense: np.ndarray, lexical: np.ndarray, k: int = RRF_K) -> np.ndarray:
+    """
+    倒数排名融合：sum(1 / (k + rank))，BM25 分数为 0 的文本块不计词法部分
+    """
+    fused = 1.0 / (k + 1 + _ranks(dense))
+    fused += np.where(lexical > 0, 1.0 / (k + 1 + _ranks(lexical)), 0.0)
+    return fused
+
+def _min_max(scores: np.ndarray) -> np.ndarray:
+    low, high = scores.min(), scores.max()
+    if high - low < 1e-12:
+        return np.zeros_like(scores)
+    return (scores - low) / (high - low)
+
+def weighted_fusion(dense: np.ndarray, lexical: np.ndarray, alpha: float = HYBRID_ALPHA) -> np.ndarray:
+    """
+    加权求和：alpha * 稠密分数 + (1 - alpha) * BM25 分数（两者先做 min-max 归一化）
+    """
+    return alpha * _min_max(dense) + (1 - alpha) * _min_max(lexical)
+
+def retrieve(
+    query: str,
+    query_vector,
+    texts: Sequence[str],
+    vectors,
+    k: int = 5,
+    mode: str = "hybrid",
+    fusion: str = "rrf",
+    bm25: Optional[BM25Index] = None
+) -> List[Tuple[int, float]]:
+    """
+    按检索模式取 top-k 文本块
+
+    Args:
+        query: 查询文本（用于 BM25）
+        query_vector: L2 归一化的查询向量
+        texts: 文本块
+        vectors: 文本块的 L2 归一化向量
+        k: 返回结果数量
+        mode: "dense"（仅向量）、"bm25"（仅词法）或 "hybrid"（融合）
+        fusion: hybrid 模式下的融合方式，"rrf" 或 "weighted"
+        bm25: 可选，已构建好的 BM25Index（多个查询共享同一组文本块时复用）
+
+    Returns:
+        List[Tuple[int, float]]: (文本块索引, 余弦相似度)，按所选模式的排序
+    """
+    _check_mode(mode)
+    if mode == "dense":
+        return top_k_search(query_vector, vectors, k, normalized=True)
+
+    dense = as_float32(vectors) @ as_float32(query_vector).reshape(-1)
+    return _rank(query, dense, bm25 or BM25Index(texts), k, mode, fusion)
+
+def retrieve_batch(
+    queries: Sequence[str],
+    query_vectors,
+    texts: Sequence[str],
+    vectors,
+    k: int = 5,
+    mode: str = "hybrid",
+    fusion: str = "rrf"
+) -> List[List[Tuple[int, float]]]:
+    """
+    多个查询共享同一组文本块的 top-k 检索
+
+    稠密分数由一次矩阵乘法得到，BM25 索引也只构建一次。
+
+    Returns:
+        List[List[Tuple[int, float]]]: 每个查询一个 (文本块索引, 余弦相似度) 列表
+    """
+    _check_mode(mode)
+    if mode == "dense":
+        return batch_top_k_search(query_vectors, vectors, k, normalized=True)
+
+    vectors = as_float32(vectors)
+    dense_scores = as_float32(query_vectors).reshape(-1, vectors.shape[1]) @ vectors.T
+    bm25 = BM25Index(texts)
+    return [_rank(query, dense, bm25, k, mode, fusion) for query, dense in zip(queries, dense_scores)]
+
+def _check_mode(mode: str) -> None:
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}, expected one of {RETRIEVAL_MODES}")
+
+def _rank(query: str, dense: np.ndarray, bm25: BM25Index, k: int, mode: str, fusion: str) -> List[Tuple[int, float]]:
+    lexical = bm25.scores(query)
+    if mode == "bm25":
+        ranking = lexical
+    elif fusion == "weighted":
+        ranking = weighted_fusion(dense, lexical)
+    else:
+        ranking = reciprocal_rank_fusion(dense, lexical)
+    return [(int(i), float(dense[i])) for i in _top_k_indices(ranking, min(k, len(dense)))]
@@ -1,14 +1,83 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
+import threading
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import EMBEDDING_CACHE_DIR, EMBEDDING_MODEL, EMBEDDING_BACKEND
+from similiarity_search.embedding_cache import EmbeddingCache
+from similiarity_search.embed_backends import load_backend
+from utils.metrics import EMBED_BATCH_TEXTS, observe_stage
 
-# 加载模型
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = EMBEDDING_MODEL
+
+_backend = None
+_embedding_cache = None
+_load_lock = threading.Lock()
+
+def get_backend():
+    """
+    首次调用时加载模型（运行时由 EMBEDDING_BACKEND 选择：torch / onnx / int8），
+    导入本模块不再需要加载模型
+    """
+    global _backend, _embedding_cache
+    if _backend is None:
+        with _load_lock:
+            if _backend is None:
+                backend = load_backend(EMBEDDING_BACKEND, MODEL_NAME)
+                # 以文本内容哈希为键的持久化 embedding 缓存（EMBEDDING_CACHE_DIR 为空时关闭）
+                # 不同后端的向量略有差异，因此缓存按 模型@后端 区分
+                if EMBEDDING_CACHE_DIR:
+                    _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, f"{MODEL_NAME}@{backend.name}", backend.dim)
+                _backend = backend
+    return _backend
+
+def get_embedding_cache():
+    get_backend()
+    return _embedding_cache
+
+def warmup():
+    """
+    加载模型并执行一次编码，使第一个请求不必承担初始化开销
+    """
+    _encode(["warmup"])
+
+def _encode(texts):
+    backend = get_backend()
+    EMBED_BATCH_TEXTS.observe(1 if isinstance(texts, str) else len(texts))
+    with observe_stage("embed"):
+        return backend.encode(texts)
 
 def embed_text(text):
-    return model.encode(text, convert_to_tensor=True)
+    return _encode(text)
 
 def embed_texts(texts):
-    return model.encode(texts, convert_to_tensor=True)
+    """
+    向量化文本列表，返回 L2 归一化的 float32 numpy 数组；只有缓存未命中的文本才会调用模型
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return _encode(texts)
+    return cache.encode(list(texts), _encode)
+
+def get_tokenizer():
+    """
+    返回模型的分词器，用于按 token 分块
+    """
+    return get_backend().tokenizer
+
+def max_chunk_tokens():
+    """
+    模型单次输入能容纳的正文 token 数（超出部分会被模型截断）
+    """
+    return get_backend().max_seq_length - 2  # 去掉 [CLS] 和 [SEP]
+
+def to_numpy(vectors):
+    """
+    将 embedding（torch tensor 或 numpy 数组）转换为 float32 numpy 数组
+    """
+    if not isinstance(vectors, np.ndarray):
+        vectors = vectors.cpu().numpy()
+    return np.asarray(vectors, dtype=np.float32)
 
 
 
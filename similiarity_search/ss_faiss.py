@@ -1,56 +1,129 @@
-import faiss
 import numpy as np
+from typing import List, Tuple
 
-def faiss_search(query_vector: np.ndarray, embedding: np.ndarray, k: int = 5) -> list:
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import FAISS_THRESHOLD
+
+def as_float32(vectors) -> np.ndarray:
+    """
+    转换为 C 连续的 float32 numpy 数组（兼容 torch tensor），已满足要求时不复制
+    """
+    if not isinstance(vectors, np.ndarray):
+        if hasattr(vectors, 'device') and str(vectors.device) != 'cpu':
+            vectors = vectors.cpu()
+        vectors = vectors.numpy()
+    return np.ascontiguousarray(vectors, dtype=np.float32)
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    按行做 L2 归一化，归一化后内积即余弦相似度
+    """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    用 argpartition 取分数最高的 k 个下标（按分数降序）
     """
-    使用FAISS进行相似度搜索
-    
+    if k < len(scores):
+        indices = np.argpartition(-scores, k - 1)[:k]
+    else:
+        indices = np.arange(len(scores))
+    return indices[np.argsort(-scores[indices], kind='stable')]
+
+def _faiss_top_k(query_vectors: np.ndarray, embedding: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+    import faiss
+    index = faiss.IndexFlatIP(embedding.shape[1])
+    index.add(embedding)
+    scores, indices = index.search(query_vectors.reshape(-1, embedding.shape[1]), k)
+    return [
+        [(int(i), float(s)) for i, s in zip(row_indices, row_scores) if i >= 0]
+        for row_indices, row_scores in zip(indices, scores)
+    ]
+
+def top_k_search(
+    query_vector,
+    embedding,
+    k: int = 5,
+    normalized: bool = False
+) -> List[Tuple[int, float]]:
+    """
+    余弦相似度 top-k 检索
+
+    小规模（每个请求几百个文本块）时直接计算内积并用 argpartition 取 top-k，
+    省去建索引的开销；向量数不少于 FAISS_THRESHOLD 时才使用 FAISS 索引。
+
     Args:
         query_vector: 查询向量
         embedding: 文本库的向量表示
         k: 返回最相似的k个结果
-        
+        normalized: 向量是否已经 L2 归一化（是则跳过归一化）
+
     Returns:
-        list: 包含最相似文本索引的列表
+        List[Tuple[int, float]]: (文本索引, 余弦相似度) 列表，按相似度降序
     """
-    # 获取向量维度
-    dim = embedding.shape[1]
-    
-    # 创建FAISS索引
-    index = faiss.IndexFlatL2(dim)
-    
-    # 确保embedding是numpy数组
-    if not isinstance(embedding, np.ndarray):
-        if hasattr(embedding, 'device') and str(embedding.device) != 'cpu':
-            embedding = embedding.cpu()
-        embedding = embedding.numpy()
-    
-    # 添加文本库向量到索引
-    index.add(embedding)
-    
-    # 确保查询向量是numpy数组
-    if not isinstance(query_vector, np.ndarray):
-        if hasattr(query_vector, 'device') and str(query_vector.device) != 'cpu':
-            query_vector = query_vector.cpu()
-        query_vector = query_vector.numpy()
-    
-    # 确保查询向量是2D数组
-    if len(query_vector.shape) == 1:
-        query_vector = query_vector.reshape(1, -1)
-    
-    # 执行搜索
-    distances, indices = index.search(query_vector, k=k)
-    
-    # 获取最相似的文本索引
-    top_chunks_idx = [idx for idx in indices[0]]
-    
-    return top_chunks_idx
+    embedding = as_float32(embedding)
+    query_vector = as_float32(query_vector).reshape(-1)
+    if not normalized:
+        embedding = normalize(embedding)
+        query_vector = normalize(query_vector)
 
+    k = min(k, len(embedding))
+    if k <= 0:
+        return []
+    if len(embedding) >= FAISS_THRESHOLD:
+        return _faiss_top_k(query_vector, embedding, k)[0]
 
+    scores = embedding @ query_vector
+    return [(int(i), float(scores[i])) for i in _top_k_indices(scores, k)]
 
+def batch_top_k_search(
+    query_vectors,
+    embedding,
+    k: int = 5,
+    normalized: bool = False
+) -> List[List[Tuple[int, float]]]:
+    """
+    多个查询共享同一文本库的余弦相似度 top-k 检索
 
+    所有查询的分数由一次矩阵乘法 Q @ E.T 得到，再逐行取 top-k。
 
+    Args:
+        query_vectors: 查询向量矩阵，每行一个查询
+        embedding: 文本库的向量表示
+        k: 每个查询返回最相似的k个结果
+        normalized: 向量是否已经 L2 归一化（是则跳过归一化）
 
+    Returns:
+        List[List[Tuple[int, float]]]: 每个查询一个 (文本索引, 余弦相似度) 列表
+    """
+    embedding = as_float32(embedding)
+    query_vectors = as_float32(query_vectors).reshape(-1, embedding.shape[1])
+    if not normalized:
+        embedding = normalize(embedding)
+        query_vectors = normalize(query_vectors)
 
-    
+    k = min(k, len(embedding))
+    if k <= 0:
+        return [[] for _ in query_vectors]
+    if len(embedding) >= FAISS_THRESHOLD:
+        return _faiss_top_k(query_vectors, embedding, k)
+
+    scores = query_vectors @ embedding.T
+    return [[(int(i), float(row[i])) for i in _top_k_indices(row, k)] for row in scores]
+
+def faiss_search(query_vector: np.ndarray, embedding: np.ndarray, k: int = 5) -> list:
+    """
+    相似度搜索（兼容旧接口），只返回索引
 
+    Args:
+        query_vector: 查询向量
+        embedding: 文本库的向量表示
+        k: 返回最相似的k个结果
+
+    Returns:
+        list: 包含最相似文本索引的列表
+    """
+    return [idx for idx, _ in top_k_search(query_vector, embedding, k)]
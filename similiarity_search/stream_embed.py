@@ -0,0 +1,129 @@
+import asyncio
+from typing import AsyncIterator, List, Tuple
+
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import EMBED_BATCH_SIZE, CHUNK_UNIT, DEDUP_THRESHOLD
+from similiarity_search.chunck_split import chunk_spans
+from similiarity_search.dedup import MinHasher, NearDuplicateIndex
+from similiarity_search.ss_aml import get_tokenizer, max_chunk_tokens
+from similiarity_search.embed_service import embedding_service
+from utils.metrics import observe_stage
+
+_DONE = object()
+
+# Pages are compared on longer shingles than chunks
+page_hasher = MinHasher(shingle_size=5)
+chunk_hasher = MinHasher(shingle_size=3)
+
+def split_page(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Split page text into chunks, sized in words or model tokens (CHUNK_UNIT)
+
+    In token mode chunk_size is capped at what the model can embed, so no
+    chunk tail is silently truncated.
+    """
+    if CHUNK_UNIT == "tokens":
+        size = min(chunk_size, max_chunk_tokens())
+        spans = chunk_spans(text, size, min(chunk_overlap, size - 1), tokenizer=get_tokenizer())
+    else:
+        spans = chunk_spans(text, chunk_size, chunk_overlap)
+    return [text[start:end] for start, end in spans]
+
+def _prepare_page(text: str, chunk_size: int, chunk_overlap: int):
+    """Page signature, chunks and chunk signatures (runs in a worker thread)"""
+    with observe_stage("chunk"):
+        chunks = split_page(text, chunk_size, chunk_overlap)
+        if DEDUP_THRESHOLD <= 0:
+            return None, chunks, [None] * len(chunks)
+        return page_hasher.signature(text), chunks, [chunk_hasher.signature(chunk) for chunk in chunks]
+
+async def stream_embed_pages(
+    pages: AsyncIterator[Tuple[str, str, float]],
+    chunk_size: int = 256,
+    chunk_overlap: int = 50,
+    max_batch: int = EMBED_BATCH_SIZE
+) -> AsyncIterator[Tuple[List[str], List[List[str]], np.ndarray]]:
+    """
+    Chunk and embed pages as they arrive
+
+    Pages are consumed from `pages` (e.g. iter_parse_web_pages) by a
+    background task, so fetching and extraction keep running while a batch
+    is being embedded. Every embedding call takes all chunks that arrived in
+    the meantime, up to max_batch, and goes through the shared embedding
+    service so it can be merged with other requests' chunks.
+
+    Near-duplicates are dropped before embedding: a page that is a
+    near-copy of an earlier one (syndicated wire stories) is not chunked at
+    all, and a chunk that is identical or near-identical to an earlier chunk
+    is not embedded again. Their URLs are appended to the source list of the
+    chunk that was kept, so each yielded URL list keeps growing until the
+    stream ends.
+
+    Yields:
+        Tuple[List[str], List[List[str]], np.ndarray]: (chunks, source URLs per chunk, vectors) per batch
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for url, text, _ in pages:
+                if not text or not text.strip():
+                    continue
+                prepared = await asyncio.to_thread(_prepare_page, text, chunk_size, chunk_overlap)
+                await queue.put((url, *prepared))
+        finally:
+            queue.put_nowait(_DONE)
+
+    producer = asyncio.create_task(produce())
+    page_index = NearDuplicateIndex()
+    chunk_index = NearDuplicateIndex()
+    # chunk text -> its source URL list; page URL -> URLs of its near-copies
+    sources = {}
+    page_copies = {}
+    try:
+        done = False
+        while not done:
+            # Wait for at least one page, then take everything else already queued
+            arrived = [await queue.get()]
+            while not queue.empty():
+                arrived.append(queue.get_nowait())
+
+            pending = []
+            for item in arrived:
+                if item is _DONE:
+                    done = True
+                    continue
+                url, page_signature, chunks, chunk_signatures = item
+                original = page_index.match_or_add(url, page_signature)
+                if original is not None:
+                    # Attribute the copy to every chunk of the original page
+                    for urls in page_copies[original]:
+                        if url not in urls:
+                            urls.append(url)
+                    continue
+                page_copies[url] = page_chunks = []
+                for chunk, signature in zip(chunks, chunk_signatures):
+                    kept = chunk if chunk in sources else chunk_index.match_or_add(chunk, signature)
+                    if kept is not None:
+                        urls = sources[kept]
+                        if url not in urls:
+                            urls.append(url)
+                    else:
+                        urls = sources[chunk] = [url]
+                        pending.append((chunk, urls))
+                    page_chunks.append(urls)
+
+            for start in range(0, len(pending), max_batch):
+                batch = pending[start:start + max_batch]
+                texts = [chunk for chunk, _ in batch]
+                vectors = await embedding_service.embed(texts)
+                yield texts, [urls for _, urls in batch], vectors
+
+        # Surface errors raised while reading pages
+        await producer
+    finally:
+        producer.cancel()
@@ -0,0 +1,180 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import VECTOR_STORE_DIR, VECTOR_STORE_HNSW_M, VECTOR_STORE_EF_SEARCH
+from similiarity_search.ss_faiss import as_float32
+from similiarity_search.ss_aml import get_backend
+
+class StoredChunk(NamedTuple):
+    text: str
+    url: str
+    score: float
+
+class VectorStore:
+    """
+    Long-lived ANN index over every chunk the pipeline has embedded
+
+    Vectors go into a FAISS HNSW index (inner product on normalized vectors,
+    i.e. cosine) wrapped in an ID map; chunk text, source URL, expiry and the
+    vector itself live in SQLite, keyed by the same id. HNSW cannot delete
+    in place, so expired chunks are removed from SQLite and filtered out of
+    search results, and the index is rebuilt from SQLite once more than
+    rebuild_ratio of it is stale. snapshot() writes the index to disk; on
+    start-up it is reloaded, or rebuilt if missing or out of date.
+    """
+
+    def __init__(self, directory: str, dim: int, rebuild_ratio: float = 0.2):
+        import faiss
+        self._faiss = faiss
+        self.dim = dim
+        self.rebuild_ratio = rebuild_ratio
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, f"chunks-{dim}.faiss")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, f"chunks-{dim}.sqlite"),
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                chunk_hash BLOB NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                text TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                added_at REAL NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_expires_at ON chunks (expires_at)")
+        self._index = self._load_index()
+
+    def _new_index(self):
+        hnsw = self._faiss.IndexHNSWFlat(self.dim, VECTOR_STORE_HNSW_M, self._faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efSearch = VECTOR_STORE_EF_SEARCH
+        return self._faiss.IndexIDMap2(hnsw)
+
+    def _load_index(self):
+        live = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        if os.path.exists(self._index_path):
+            try:
+                index = self._faiss.read_index(self._index_path)
+                # Rows added after the last snapshot are missing from the file
+                if index.ntotal >= live and not self._unindexed(index):
+                    self._faiss.downcast_index(index.index).hnsw.efSearch = VECTOR_STORE_EF_SEARCH
+                    return index
+            except RuntimeError as e:
+                print(f"Rebuilding vector index, snapshot unreadable: {str(e)}")
+        return self._rebuild()
+
+    def _unindexed(self, index) -> bool:
+        max_id = self._conn.execute("SELECT MAX(id) FROM chunks").fetchone()[0]
+        if max_id is None:
+            return False
+        ids = self._faiss.vector_to_array(index.id_map)
+        return len(ids) == 0 or int(ids.max()) < max_id
+
+    def _rebuild(self):
+        index = self._new_index()
+        rows = self._conn.execute("SELECT id, vector FROM chunks").fetchall()
+        if rows:
+            ids = np.array([row[0] for row in rows], dtype=np.int64)
+            vectors = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.float32).reshape(len(rows), self.dim)
+            index.add_with_ids(vectors, ids)
+        return index
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    @staticmethod
+    def chunk_hash(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def add(self, texts: Sequence[str], urls: Sequence[str], vectors, ttls: Sequence[float]) -> int:
+        """
+        Add chunks that are not indexed yet; returns the number added
+
+        vectors must be L2-normalized, one row per text.
+        """
+        vectors = as_float32(vectors).reshape(len(texts), self.dim)
+        now = time.time()
+        with self._lock:
+            ids, rows = [], []
+            # One transaction for the whole batch instead of one per row
+            self._conn.execute("BEGIN")
+            with self._conn:
+                for text, url, vector, ttl in zip(texts, urls, vectors, ttls):
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO chunks (chunk_hash, url, text, vector, added_at, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (self.chunk_hash(text), url, text, vector.tobytes(), now, now + ttl)
+                    )
+                    if cursor.rowcount:
+                        ids.append(cursor.lastrowid)
+                        rows.append(vector)
+            if ids:
+                self._index.add_with_ids(np.stack(rows), np.array(ids, dtype=np.int64))
+        return len(ids)
+
+    def search(self, query_vector, k: int = 5) -> List[StoredChunk]:
+        """Top-k unexpired chunks by cosine similarity (query must be normalized)"""
+        query_vector = as_float32(query_vector).reshape(1, self.dim)
+        with self._lock:
+            if self._index.ntotal == 0:
+                return []
+            # Over-fetch to make up for expired entries still in the index
+            scores, ids = self._index.search(query_vector, min(self._index.ntotal, k * 4))
+            hits = {int(i): float(s) for i, s in zip(ids[0], scores[0]) if i >= 0}
+            if not hits:
+                return []
+            placeholders = ",".join("?" * len(hits))
+            rows = self._conn.execute(
+                f"SELECT id, text, url FROM chunks WHERE id IN ({placeholders}) AND expires_at > ?",
+                (*hits, time.time())
+            ).fetchall()
+        results = [StoredChunk(text, url, hits[chunk_id]) for chunk_id, text, url in rows]
+        results.sort(key=lambda chunk: chunk.score, reverse=True)
+        return results[:k]
+
+    def evict_expired(self) -> int:
+        """Drop expired chunks, rebuilding the index if too much of it is stale"""
+        with self._lock:
+            evicted = self._conn.execute("DELETE FROM chunks WHERE expires_at <= ?", (time.time(),)).rowcount
+            stale = self._index.ntotal - len(self)
+            if stale > 0 and stale >= self.rebuild_ratio * self._index.ntotal:
+                self._index = self._rebuild()
+        return evicted
+
+    def snapshot(self) -> None:
+        """Write the index to disk (atomically); metadata is already durable"""
+        with self._lock:
+            tmp_path = f"{self._index_path}.tmp"
+            self._faiss.write_index(self._index, tmp_path)
+            os.replace(tmp_path, self._index_path)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_store: Optional[VectorStore] = None
+_store_lock = threading.Lock()
+
+def get_vector_store() -> Optional[VectorStore]:
+    """Return the process-wide vector store, or None if VECTOR_STORE_DIR is empty"""
+    global _store
+    if not VECTOR_STORE_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = VectorStore(VECTOR_STORE_DIR, get_backend().dim)
+    return _store
@@ -0,0 +1,65 @@
+import asyncio
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from web_page_parse.fetch_scheduler import FetchScheduler
+
+def test_cancelled_waiters_release_their_slots():
+    """Cancelling queued waiters together with the slot holder leaves no slot behind"""
+    async def run():
+        scheduler = FetchScheduler(max_in_flight=4, per_host=1)
+        request_key = object()
+        holding = asyncio.Event()
+
+        async def fetch():
+            async with scheduler.slot(request_key, "http://w.com/page"):
+                holding.set()
+                await asyncio.sleep(10)
+
+        tasks = [asyncio.create_task(fetch()) for _ in range(3)]
+        await holding.wait()
+        assert scheduler.in_flight == 1 and scheduler.queued == 2
+        # One cancel round (as at a deadline): the holder releases its slot
+        # before the queued waiters' cancellation handlers have run
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert scheduler.in_flight == 0
+        assert dict(scheduler._host_in_flight) == {}
+        assert scheduler.queued == 0
+
+        # The host is usable again
+        async with scheduler.slot(object(), "http://w.com/other"):
+            assert scheduler.in_flight == 1
+        assert scheduler.in_flight == 0
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+def test_granted_then_cancelled_waiter_releases_slot():
+    """A waiter cancelled after its slot was granted gives the slot back"""
+    async def run():
+        scheduler = FetchScheduler(max_in_flight=1, per_host=1)
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot(object(), "http://a.com/"):
+                await release.wait()
+
+        async def waiter():
+            async with scheduler.slot(object(), "http://b.com/"):
+                await asyncio.sleep(10)
+
+        first = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        second = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        # Grant the slot to the waiter and cancel it before it resumes
+        release.set()
+        await first
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        assert scheduler.in_flight == 0
+        assert dict(scheduler._host_in_flight) == {}
+
+    asyncio.run(asyncio.wait_for(run(), 5))
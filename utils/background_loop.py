@@ -0,0 +1,87 @@
+import asyncio
+import atexit
+import threading
+from typing import Awaitable, Callable, List, Optional, TypeVar
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.http_client import http_clients
+
+T = TypeVar("T")
+
+class BackgroundLoop:
+    """
+    One event loop on a daemon thread, shared by every synchronous caller
+
+    Sync wrappers used to call asyncio.run per call, which builds a new loop
+    each time and so can never reuse the shared HTTP pools, the embedding
+    service or anything else bound to a loop. Coroutines submitted with
+    run() all execute on this loop instead; it is started on first use with
+    the shared HTTP pools open, and stopped at interpreter exit after the
+    registered on_close callbacks have run.
+    """
+
+    def __init__(self, name: str = "background-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closers: List[Callable[[], Awaitable[None]]] = []
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    self._start()
+        return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=loop.run_forever, name=self.name, daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(http_clients.start(), loop).result()
+        self._loop = loop
+        atexit.register(self.close)
+
+    def on_close(self, closer: Callable[[], Awaitable[None]]) -> None:
+        """Await closer on the loop before it stops (last registered runs first)"""
+        self._closers.append(closer)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run coro on the background loop and block until it returns"""
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from the background loop itself")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def close(self, timeout: float = 10) -> None:
+        with self._lock:
+            loop, self._loop = self._loop, None
+            if loop is None:
+                return
+            closers, self._closers = self._closers, []
+
+        async def shutdown():
+            for closer in reversed(closers):
+                try:
+                    await closer()
+                except Exception as e:
+                    print(f"Error closing background loop resources: {str(e)}")
+            await http_clients.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout)
+        except Exception as e:
+            print(f"Background loop shutdown failed: {str(e)}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
+
+# Process-wide loop used by the synchronous wrappers
+background_loop = BackgroundLoop()
+
+def run_sync(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run coro on the shared background loop from synchronous code"""
+    return background_loop.run(coro, timeout)
@@ -0,0 +1,203 @@
+import asyncio
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Union
+
+_MISSING = object()
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize free text for use as a cache key
+
+    Applies NFKC normalization, case folding and whitespace collapsing so
+    that trivially different spellings of the same query share one entry.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a TTL
+
+    Concurrent misses on the same key are coalesced (single-flight): only the
+    first caller computes the value, the others wait for and share its result.
+    The TTL passed to the get_or_compute helpers may be a callable receiving
+    the computed value, for entries whose freshness depends on content.
+    If a path is given, entries are persisted to a JSON file and reloaded on
+    start-up, so keys must be strings and values JSON serializable. Writes
+    are debounced: the file is rewritten on a timer thread at most once per
+    save_delay seconds (and at exit), never by the caller of set().
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, path: Optional[str] = None,
+                 save_delay: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._async_inflight = {}
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        if path:
+            self._load()
+            atexit.register(self.flush)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key, evicting the least recently used entries"""
+        with self._lock:
+            self._data[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        if self.path:
+            self._schedule_save()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+        if self.path:
+            self._schedule_save()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _resolve_ttl(self, ttl, value: Any) -> Optional[float]:
+        return ttl(value) if callable(ttl) else ttl
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       ttl: Union[float, Callable[[Any], float], None] = None) -> Any:
+        """
+        Return the cached value, computing it with compute() on a miss
+
+        Threads missing on the same key wait for the first one instead of
+        calling compute() themselves.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {"event": threading.Event()}
+
+        if not leader:
+            flight["event"].wait()
+            if "error" in flight:
+                raise flight["error"]
+            return flight["value"]
+
+        try:
+            flight["value"] = compute()
+            self.set(key, flight["value"], self._resolve_ttl(ttl, flight["value"]))
+            return flight["value"]
+        except BaseException as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight["event"].set()
+
+    async def aget_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                              ttl: Union[float, Callable[[Any], float], None] = None) -> Any:
+        """
+        Async variant of get_or_compute
+
+        The computation runs in its own task, so a cancelled caller does not
+        cancel the upstream call the other waiters are sharing.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        task = self._async_inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._async_inflight[key] = task
+
+            def _done(t: asyncio.Future) -> None:
+                self._async_inflight.pop(key, None)
+                if not t.cancelled() and t.exception() is None:
+                    self.set(key, t.result(), self._resolve_ttl(ttl, t.result()))
+
+            task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+    def _schedule_save(self) -> None:
+        with self._lock:
+            self._dirty = True
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self) -> None:
+        """Write pending changes to the JSON file now, if there are any"""
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+            dirty, self._dirty = self._dirty, False
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if dirty:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Failed to save cache file {self.path}: {str(e)}")
+
+    def save(self) -> None:
+        """Write unexpired entries to the JSON file (atomically)"""
+        with self._lock:
+            now = time.time()
+            payload = [[k, expires_at, v] for k, (expires_at, v) in self._data.items() if expires_at > now]
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable cache file {self.path}: {str(e)}")
+            return
+        now = time.time()
+        for key, expires_at, value in payload[-self.maxsize:]:
+            if expires_at > now:
+                self._data[key] = (expires_at, value)
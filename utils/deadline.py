@@ -0,0 +1,48 @@
+import math
+import time
+from typing import Optional
+
+class Deadline:
+    """
+    Absolute per-request time budget, consulted by every pipeline stage
+
+    Deadline(None) never expires, so stages can call timeout() and
+    remaining() unconditionally and keep their own caps when no budget
+    was given.
+    """
+
+    def __init__(self, budget: Optional[float] = None):
+        self.budget = budget
+        self.expires_at = None if budget is None else time.monotonic() + budget
+
+    @classmethod
+    def from_ms(cls, budget_ms: Optional[float]) -> "Deadline":
+        return cls(None if not budget_ms else budget_ms / 1000)
+
+    @property
+    def bounded(self) -> bool:
+        return self.expires_at is not None
+
+    def remaining(self) -> float:
+        """Seconds left (never negative), inf without a budget"""
+        if self.expires_at is None:
+            return math.inf
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None) -> Optional[float]:
+        """Timeout for the next step: the remaining budget, capped at cap (None if both are unbounded)"""
+        remaining = self.remaining()
+        if cap is not None:
+            remaining = min(remaining, cap)
+        return None if math.isinf(remaining) else remaining
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """A deadline `seconds` earlier, leaving that much for the stages after this one"""
+        child = Deadline()
+        if self.expires_at is not None:
+            child.expires_at = self.expires_at - seconds
+        return child
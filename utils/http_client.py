@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+import aiohttp
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import (
+    BRAVE_POOL_LIMIT, PAGE_POOL_LIMIT, PAGE_POOL_LIMIT_PER_HOST,
+    HTTP_DNS_CACHE_TTL, HTTP_KEEPALIVE_TIMEOUT
+)
+
+# Connector limits per pool: (total connections, connections per host)
+POOL_LIMITS = {
+    "brave": (BRAVE_POOL_LIMIT, BRAVE_POOL_LIMIT),
+    "pages": (PAGE_POOL_LIMIT, PAGE_POOL_LIMIT_PER_HOST),
+}
+
+
+def make_connector(pool: str) -> aiohttp.TCPConnector:
+    """Create a keep-alive connector with DNS caching for the given pool"""
+    limit, limit_per_host = POOL_LIMITS[pool]
+    return aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+
+
+class HttpClientPool:
+    """
+    Process-wide aiohttp sessions, one per upstream pool
+
+    "brave" is used for api.search.brave.com and "pages" for arbitrary page
+    hosts, so a burst of page fetches can never starve the search API of
+    connections. Sessions are bound to the event loop they were started on.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self) -> None:
+        if self._sessions:
+            return
+        self._loop = asyncio.get_running_loop()
+        for pool in POOL_LIMITS:
+            self._sessions[pool] = aiohttp.ClientSession(connector=make_connector(pool))
+
+    async def close(self) -> None:
+        sessions, self._sessions = self._sessions, {}
+        self._loop = None
+        for session in sessions.values():
+            await session.close()
+
+    def get(self, pool: str) -> Optional[aiohttp.ClientSession]:
+        """Return the shared session for pool if started on the running loop"""
+        session = self._sessions.get(pool)
+        if session is None or session.closed:
+            return None
+        try:
+            if asyncio.get_running_loop() is not self._loop:
+                return None
+        except RuntimeError:
+            return None
+        return session
+
+
+http_clients = HttpClientPool()
+
+
+@asynccontextmanager
+async def client_session(pool: str):
+    """
+    Yield the shared session for pool
+
+    Outside of a started HttpClientPool (scripts, sync wrappers running their
+    own event loop) a short-lived session with the same connector settings
+    is created and closed on exit.
+    """
+    session = http_clients.get(pool)
+    if session is not None:
+        yield session
+        return
+    async with aiohttp.ClientSession(connector=make_connector(pool)) as session:
+        yield session
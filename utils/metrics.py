@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+from urllib.parse import urlsplit
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import METRICS_MAX_HOSTS
+
+STAGE_SECONDS = Histogram(
+    "search_stage_seconds",
+    "Time spent in each pipeline stage",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 20)
+)
+FETCH_SECONDS = Histogram(
+    "fetch_seconds",
+    "Page download latency by host (queueing for a fetch slot excluded)",
+    ["host"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5)
+)
+FETCH_TOTAL = Counter(
+    "fetch_total",
+    "Page fetches by host and outcome",
+    ["host", "outcome"]
+)
+EMBED_BATCH_TEXTS = Histogram(
+    "embedding_batch_size",
+    "Texts per embedding model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Lookups of caches that do not keep their own counters, by result",
+    ["cache", "result"]
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop runs a callback scheduled with a fixed delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+DEADLINE_CUTOFFS = Counter(
+    "deadline_cutoffs_total",
+    "Pipeline stages skipped or cut short by the request deadline",
+    ["stage"]
+)
+
+@contextmanager
+def observe_stage(stage: str):
+    """Time the enclosed block into search_stage_seconds{stage=...}"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+_hosts = set()
+_hosts_lock = threading.Lock()
+
+def host_label(url: str) -> str:
+    """Host of url, or "other" once METRICS_MAX_HOSTS hosts have been seen (bounds label cardinality)"""
+    host = urlsplit(url).hostname or "unknown"
+    with _hosts_lock:
+        if host in _hosts:
+            return host
+        if len(_hosts) < METRICS_MAX_HOSTS:
+            _hosts.add(host)
+            return host
+    return "other"
+
+def observe_fetch(url: str, outcome: str, seconds: float = None) -> None:
+    host = host_label(url)
+    FETCH_TOTAL.labels(host, outcome).inc()
+    if seconds is not None:
+        FETCH_SECONDS.labels(host).observe(seconds)
+
+class CacheStatsCollector:
+    """
+    Exposes the hits/misses counters that caches (TTLCache, EmbeddingCache)
+    already keep, read at scrape time so lookups pay nothing extra
+    """
+
+    def __init__(self):
+        self._caches: Dict[str, object] = {}
+
+    def register(self, name: str, cache) -> None:
+        self._caches[name] = cache
+
+    def collect(self):
+        family = CounterMetricFamily("cache_requests", "Cache lookups by result", labels=["cache", "result"])
+        for name, cache in list(self._caches.items()):
+            family.add_metric([name, "hit"], cache.hits)
+            family.add_metric([name, "miss"], cache.misses)
+        yield family
+
+cache_stats = CacheStatsCollector()
+REGISTRY.register(cache_stats)
+
+async def monitor_event_loop_lag(interval: float = 0.25) -> None:
+    """Measure event-loop lag until cancelled (run as a task on the loop to watch)"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+def render_metrics():
+    """Return (body, content type) for a Prometheus scrape"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,101 @@
+import asyncio
+import multiprocessing
+import signal
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Union
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import EXTRACT_WORKERS, EXTRACT_MAX_PENDING, EXTRACT_CPU_TIMEOUT
+
+EXTRACT_OPTIONS = dict(
+    favor_precision=True,
+    include_comments=False,
+    include_tables=False,
+    output_format="txt"
+)
+
+class ExtractionTimeout(Exception):
+    """Raised in a worker when a document exceeds its CPU time budget"""
+
+def extract_text(html: Union[str, bytes]) -> str:
+    """
+    Extract the main text of a page with trafilatura (synchronous)
+    """
+    import trafilatura
+    return trafilatura.extract(html, **EXTRACT_OPTIONS) or ""
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+def _init_worker() -> None:
+    # SIGVTALRM fires after the worker has consumed its budget of user CPU time
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGVTALRM, _raise_timeout)
+
+def _extract_in_worker(html: Union[str, bytes], cpu_timeout: float) -> str:
+    """Worker entry point: page content in, extracted text out"""
+    if cpu_timeout > 0 and hasattr(signal, "setitimer"):
+        signal.setitimer(signal.ITIMER_VIRTUAL, cpu_timeout)
+    try:
+        return extract_text(html)
+    finally:
+        if hasattr(signal, "setitimer"):
+            signal.setitimer(signal.ITIMER_VIRTUAL, 0)
+
+_pool: Optional[ProcessPoolExecutor] = None
+# One pending-queue semaphore per event loop
+_pending = weakref.WeakKeyDictionary()
+
+def get_extract_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the extraction process pool, creating it on first use"""
+    global _pool
+    if EXTRACT_WORKERS <= 0:
+        return None
+    if _pool is None:
+        # spawn avoids forking a parent that already runs threads (uvicorn, torch)
+        _pool = ProcessPoolExecutor(
+            max_workers=EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker
+        )
+    return _pool
+
+def shutdown_extract_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def async_extract_text(html: Union[str, bytes], cpu_timeout: float = EXTRACT_CPU_TIMEOUT) -> str:
+    """
+    Extract text off the event loop
+
+    At most EXTRACT_MAX_PENDING documents are queued or running per event
+    loop; further callers wait for a slot. Documents exceeding the CPU
+    timeout raise ExtractionTimeout. With EXTRACT_WORKERS = 0 extraction
+    runs in a thread instead of the process pool.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _pending.get(loop)
+    if semaphore is None:
+        semaphore = _pending[loop] = asyncio.Semaphore(EXTRACT_MAX_PENDING)
+
+    async with semaphore:
+        pool = get_extract_pool()
+        if pool is None:
+            return await asyncio.to_thread(extract_text, html)
+        try:
+            return await loop.run_in_executor(pool, _extract_in_worker, html, cpu_timeout)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start a fresh pool for later calls
+            shutdown_extract_pool()
+            raise
+
+async def warmup_extract_pool() -> None:
+    """Start the worker processes and import trafilatura in each of them"""
+    html = "<html><body><p>warmup</p></body></html>"
+    await asyncio.gather(*[async_extract_text(html, cpu_timeout=0) for _ in range(max(1, EXTRACT_WORKERS))])
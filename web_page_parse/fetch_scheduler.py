@@ -0,0 +1,116 @@
+import asyncio
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Hashable, Tuple
+from urllib.parse import urlsplit
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import FETCH_MAX_IN_FLIGHT, FETCH_PER_HOST
+
+class FetchScheduler:
+    """
+    Admission control for page fetches
+
+    Limits the number of fetches in flight globally and per host. Waiting
+    fetches are queued per request and slots are handed out round-robin
+    across requests, so one search with many URLs cannot starve the others.
+    A fetch whose host is saturated is skipped over (not blocking the queue)
+    until that host frees a slot.
+    """
+
+    def __init__(self, max_in_flight: int = FETCH_MAX_IN_FLIGHT, per_host: int = FETCH_PER_HOST):
+        self.max_in_flight = max_in_flight
+        self.per_host = per_host
+        self.in_flight = 0
+        self._host_in_flight: Counter = Counter()
+        self._waiting: Dict[Hashable, Deque[Tuple[str, asyncio.Future]]] = {}
+        self._order: Deque[Hashable] = deque()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._waiting.values())
+
+    @asynccontextmanager
+    async def slot(self, request_key: Hashable, url: str):
+        """Wait for a fetch slot for url on behalf of request_key"""
+        host = urlsplit(url).hostname or ""
+        waiter = asyncio.get_running_loop().create_future()
+        if request_key not in self._waiting:
+            self._waiting[request_key] = deque()
+            self._order.append(request_key)
+        self._waiting[request_key].append((host, waiter))
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just before the cancellation arrived
+                self._release(host)
+            else:
+                self._forget(request_key, waiter)
+            raise
+
+        try:
+            yield
+        finally:
+            self._release(host)
+
+    def _release(self, host: str) -> None:
+        self.in_flight -= 1
+        self._host_in_flight[host] -= 1
+        if self._host_in_flight[host] <= 0:
+            del self._host_in_flight[host]
+        self._dispatch()
+
+    def _forget(self, request_key: Hashable, waiter: asyncio.Future) -> None:
+        queue = self._waiting.get(request_key)
+        if queue is None:
+            return
+        for entry in queue:
+            if entry[1] is waiter:
+                queue.remove(entry)
+                break
+        if not queue:
+            self._drop(request_key)
+
+    def _drop(self, request_key: Hashable) -> None:
+        del self._waiting[request_key]
+        self._order.remove(request_key)
+
+    def _dispatch(self) -> None:
+        while self.in_flight < self.max_in_flight and self._grant_next():
+            pass
+
+    def _grant_next(self) -> bool:
+        """Grant one slot to the next request (round-robin) that has a runnable fetch"""
+        for _ in range(len(self._order)):
+            if not self._order:
+                break
+            request_key = self._order[0]
+            self._order.rotate(-1)
+            queue = self._waiting[request_key]
+            # Waiters cancelled before their cancellation handler ran (e.g.
+            # sibling fetches cut off at the deadline) must not take a slot
+            for entry in [entry for entry in queue if entry[1].done()]:
+                queue.remove(entry)
+            granted = False
+            for index, (host, waiter) in enumerate(queue):
+                if self._host_in_flight[host] >= self.per_host:
+                    continue
+                del queue[index]
+                waiter.set_result(None)
+                self.in_flight += 1
+                self._host_in_flight[host] += 1
+                granted = True
+                break
+            if not queue:
+                self._drop(request_key)
+            if granted:
+                return True
+        return False
+
+# Shared by every request in the process
+fetch_scheduler = FetchScheduler()
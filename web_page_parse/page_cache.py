@@ -0,0 +1,173 @@
+import re
+import sqlite3
+import threading
+import time
+from typing import Mapping, NamedTuple, Optional
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.setting import PAGE_CACHE_PATH, PAGE_CACHE_MAX_BYTES, PAGE_CACHE_TTL
+
+class CachedPage(NamedTuple):
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def conditional_headers(self) -> dict:
+        """Headers turning a refetch into a conditional GET"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+def cache_ttl(headers: Mapping[str, str], default: float = PAGE_CACHE_TTL) -> float:
+    """
+    Per-entry TTL from the response's Cache-Control header
+
+    max-age/s-maxage win over the default, no-store/no-cache give 0 (the
+    entry is kept for revalidation but never served without a check).
+    """
+    cache_control = (headers.get("Cache-Control") or "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0.0
+    match = re.search(r"(?:s-maxage|max-age)\s*=\s*(\d+)", cache_control)
+    if match:
+        return float(match.group(1))
+    return default
+
+class PageCache:
+    """
+    SQLite-backed cache of extracted page text
+
+    Maps URL to extracted text plus the ETag/Last-Modified validators of the
+    response it came from. Entries past their TTL are revalidated with a
+    conditional GET. When the stored text exceeds max_bytes the least
+    recently used entries are evicted. The total size is kept up to date by
+    triggers, so neither an insert nor an eviction scans the table (and the
+    total stays right when several processes share the file).
+    """
+
+    def __init__(self, path: str, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages (accessed_at)")
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)"
+            )
+            # Caches created before the running total start from one full sum
+            self._conn.execute(
+                "INSERT OR IGNORE INTO pages_size SELECT 0, COALESCE(SUM(size), 0) FROM pages"
+            )
+            for statement in (
+                """CREATE TRIGGER IF NOT EXISTS pages_size_insert AFTER INSERT ON pages
+                   BEGIN UPDATE pages_size SET total = total + new.size; END""",
+                """CREATE TRIGGER IF NOT EXISTS pages_size_delete AFTER DELETE ON pages
+                   BEGIN UPDATE pages_size SET total = total - old.size; END""",
+                """CREATE TRIGGER IF NOT EXISTS pages_size_update AFTER UPDATE OF size ON pages
+                   BEGIN UPDATE pages_size SET total = total + new.size - old.size; END""",
+            ):
+                self._conn.execute(statement)
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Return the cached entry for url (fresh or stale), or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, etag, last_modified, expires_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return CachedPage(*row)
+
+    def put(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str], ttl: float) -> None:
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                # An upsert rather than INSERT OR REPLACE, whose implicit
+                # delete would not fire the size trigger
+                self._conn.execute(
+                    """
+                    INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (url) DO UPDATE SET
+                        text = excluded.text, etag = excluded.etag, last_modified = excluded.last_modified,
+                        expires_at = excluded.expires_at, size = excluded.size, accessed_at = excluded.accessed_at
+                    """,
+                    (url, text, etag, last_modified, now + ttl, size, now)
+                )
+                self._evict()
+
+    def touch(self, url: str, ttl: float) -> None:
+        """Extend an entry's lifetime after a 304 Not Modified"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET expires_at = ?, accessed_at = ? WHERE url = ?", (now + ttl, now, url)
+            )
+
+    @property
+    def total_bytes(self) -> int:
+        return self._conn.execute("SELECT total FROM pages_size").fetchone()[0]
+
+    def _evict(self, batch: int = 32) -> None:
+        """Delete least recently used entries, a batch at a time, until under max_bytes"""
+        total = self.total_bytes
+        while total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT url, size FROM pages ORDER BY accessed_at LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                return
+            evicted = []
+            for url, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append((url,))
+                total -= size
+            self._conn.executemany("DELETE FROM pages WHERE url = ?", evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+def get_page_cache() -> Optional[PageCache]:
+    """Return the process-wide page cache, or None if PAGE_CACHE_PATH is empty"""
+    global _page_cache
+    if not PAGE_CACHE_PATH:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache(PAGE_CACHE_PATH)
+    return _page_cache
@@ -1,59 +1,180 @@
-import trafilatura
 import asyncio
+import codecs
+import re
 import aiohttp
 import requests
-from typing import List, Tuple, Optional
+from typing import AsyncIterator, List, Mapping, Tuple, Optional
 import time
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.http_client import client_session
+from web_page_parse.extract_pool import async_extract_text, extract_text, ExtractionTimeout
+from web_page_parse.fetch_scheduler import fetch_scheduler
+from web_page_parse.page_cache import get_page_cache, cache_ttl
+from config.setting import PAGE_MAX_BYTES, PAGE_CONTENT_TYPES, HTTP_TIMEOUT, PARSE_TIMEOUT
+from utils.deadline import Deadline
+from utils.metrics import CACHE_LOOKUPS, DEADLINE_CUTOFFS, observe_fetch, observe_stage
 
-# Timeout settings
-HTTP_TIMEOUT = 3  # HTTP request timeout in seconds
-PARSE_TIMEOUT = 3  # Total parsing timeout in seconds
+READ_CHUNK_SIZE = 64 * 1024  # Bytes read from the socket at a time
+META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([A-Za-z0-9_-]+)""", re.IGNORECASE)
 
-async def async_fetch_url(url: str, session: aiohttp.ClientSession) -> Optional[str]:
+def _incremental_decoder(charset: Optional[str], first_chunk: bytes):
     """
-    Asynchronously fetch URL content with timeout
+    Incremental decoder for the declared charset
+
+    Falls back to a <meta charset> in the first chunk, then to UTF-8; bytes
+    that do not decode are replaced rather than triggering charset detection.
+    """
+    if not charset:
+        match = META_CHARSET_RE.search(first_chunk[:4096])
+        charset = match.group(1).decode("ascii") if match else "utf-8"
+    try:
+        return codecs.getincrementaldecoder(charset)(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+async def read_page_text(response: aiohttp.ClientResponse, max_bytes: int = PAGE_MAX_BYTES) -> Optional[str]:
+    """
+    Stream and decode a page body, refusing non-HTML content
+    
+    The Content-Type is checked before any of the body is read, and reading
+    stops once max_bytes have been received (the truncated page is kept;
+    the main text is usually near the top).
+    
+    Returns:
+        Optional[str]: Decoded text, or None if the content type is not accepted
+    """
+    if response.content_type not in PAGE_CONTENT_TYPES:
+        print(f"Skipping {response.url}: content type {response.content_type}")
+        return None
+    
+    decoder = None
+    parts = []
+    received = 0
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        chunk = chunk[:max_bytes - received]
+        received += len(chunk)
+        if decoder is None:
+            decoder = _incremental_decoder(response.charset, chunk)
+        parts.append(decoder.decode(chunk))
+        if received >= max_bytes:
+            break
+    if decoder is not None:
+        parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+async def async_fetch_page(
+    url: str,
+    session: aiohttp.ClientSession,
+    headers: Optional[dict] = None
+) -> Tuple[int, Optional[str], Mapping[str, str]]:
+    """
+    Asynchronously fetch a URL with timeout
+    
+    Returns:
+        Tuple[int, Optional[str], Mapping[str, str]]: (status, body, response headers);
+        body is only read for 200 responses with an accepted content type
+        (see read_page_text), status is 0 if the request failed
+
+    Raises:
+        asyncio.TimeoutError: the request took longer than HTTP_TIMEOUT
+        (aiohttp's timeout errors are subclasses of it), so callers can tell
+        slow pages from failed ones
     """
     try:
         timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
-        async with session.get(url, timeout=timeout) as response:
+        async with session.get(url, timeout=timeout, headers=headers) as response:
             if response.status == 200:
-                return await response.text()
+                return response.status, await read_page_text(response), response.headers
+            return response.status, None, response.headers
     except asyncio.TimeoutError:
-        print(f"Request timeout {url}: exceeded {HTTP_TIMEOUT} seconds")
+        raise
     except Exception as e:
         print(f"Error fetching URL {url}: {str(e)}")
-    return None
+    return 0, None, {}
 
-async def async_parse_web_page(url: str, session: aiohttp.ClientSession) -> Tuple[str, str, float]:
+async def async_fetch_url(url: str, session: aiohttp.ClientSession) -> Optional[str]:
+    """
+    Asynchronously fetch URL content with timeout
+    """
+    try:
+        _, body, _ = await async_fetch_page(url, session)
+    except asyncio.TimeoutError:
+        print(f"Request timeout {url}: exceeded {HTTP_TIMEOUT} seconds")
+        return None
+    return body
+
+def _fetch_outcome(status: int, body: Optional[str]) -> str:
+    if status == 304:
+        return "not_modified"
+    if status == 0:
+        return "error"
+    if status >= 400:
+        return "http_error"
+    return "ok" if body is not None else "skipped"
+
+async def async_parse_web_page(url: str, session: aiohttp.ClientSession, request_key=None) -> Tuple[str, str, float]:
     """
     Asynchronously parse webpage with timeout
+    
+    Fresh entries in the page cache are returned without touching the
+    network; stale ones are revalidated with a conditional GET, and a 304
+    skips both the transfer and the extraction.
+    The download waits for a slot from the shared fetch scheduler; pages
+    belonging to the same search should pass the same request_key.
     """
     start_time = time.time()
+    cache = get_page_cache()
+    cached = None
     
     try:
-        # Use asyncio.wait_for to add overall timeout
-        downloaded = await asyncio.wait_for(
-            async_fetch_url(url, session),
-            timeout=PARSE_TIMEOUT
-        )
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.get, url)
+            if cached is not None and cached.is_fresh:
+                CACHE_LOOKUPS.labels("page", "hit").inc()
+                return url, cached.text, time.time() - start_time
+            CACHE_LOOKUPS.labels("page", "miss" if cached is None else "stale").inc()
+        
+        # Use asyncio.wait_for to add overall timeout (queueing time excluded)
+        async with fetch_scheduler.slot(request_key, url):
+            fetch_start = time.perf_counter()
+            try:
+                with observe_stage("fetch"):
+                    status, downloaded, headers = await asyncio.wait_for(
+                        async_fetch_page(url, session, cached.conditional_headers() if cached else None),
+                        timeout=PARSE_TIMEOUT
+                    )
+            except asyncio.TimeoutError:
+                observe_fetch(url, "timeout", time.perf_counter() - fetch_start)
+                raise
+        observe_fetch(url, _fetch_outcome(status, downloaded), time.perf_counter() - fetch_start)
+        
+        if status == 304 and cached is not None:
+            await asyncio.to_thread(cache.touch, url, cache_ttl(headers))
+            return url, cached.text, time.time() - start_time
         
         if not downloaded:
             return url, "", time.time() - start_time
         
-        # Extract text (synchronous operation, but included in total timeout)
-        extracted_text = trafilatura.extract(
-            downloaded,
-            favor_precision=True,
-            include_comments=False,
-            include_tables=False,
-            output_format="txt"
-        )
+        # Extract text in the process pool (only page and extracted text cross over)
+        with observe_stage("extract"):
+            extracted_text = await async_extract_text(downloaded)
+        
+        if cache is not None and extracted_text:
+            await asyncio.to_thread(
+                cache.put, url, extracted_text,
+                headers.get("ETag"), headers.get("Last-Modified"), cache_ttl(headers)
+            )
         
         parse_time = time.time() - start_time
-        return url, extracted_text or "", parse_time
+        return url, extracted_text, parse_time
         
     except asyncio.TimeoutError:
-        print(f"Parsing timeout {url}: exceeded {PARSE_TIMEOUT} seconds")
+        print(f"Parsing timeout {url}: no response within {HTTP_TIMEOUT} or no page within {PARSE_TIMEOUT} seconds")
+        return url, "", time.time() - start_time
+    except ExtractionTimeout:
+        print(f"Extraction timeout {url}: exceeded CPU budget")
         return url, "", time.time() - start_time
     except Exception as e:
         print(f"Error parsing {url}: {str(e)}")
@@ -70,10 +191,10 @@ async def parse_web_pages_parallel(urls: List[str]) -> List[Tuple[str, str, floa
         List[Tuple[str, str, float]]: List of (url, extracted_text, parse_time)
     """
     try:
-        # Set client session default timeout
-        timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            tasks = [async_parse_web_page(url, session) for url in urls]
+        # Reuse the shared page pool (per-request timeouts are set in async_fetch_url)
+        async with client_session("pages") as session:
+            request_key = object()
+            tasks = [async_parse_web_page(url, session, request_key) for url in urls]
             results = await asyncio.gather(*tasks, return_exceptions=True)
             
             # Handle any exceptions in results
@@ -91,6 +212,43 @@ async def parse_web_pages_parallel(urls: List[str]) -> List[Tuple[str, str, floa
         print(f"Parallel processing error: {str(e)}")
         return [(url, "", 0.0) for url in urls]
 
+async def iter_parse_web_pages(
+    urls: List[str],
+    deadline: Optional[Deadline] = None
+) -> AsyncIterator[Tuple[str, str, float]]:
+    """
+    Parse multiple webpages in parallel, yielding each one as soon as it is done
+    
+    Unlike parse_web_pages_parallel, the slowest page does not hold back the
+    others. Pages still in flight are cancelled if the consumer stops early
+    or when the deadline passes, which ends the iteration.
+    
+    Args:
+        urls: List of URLs to parse
+        deadline: Optional Deadline to stop at
+    
+    Yields:
+        Tuple[str, str, float]: (url, extracted_text, parse_time) in completion order
+    """
+    async with client_session("pages") as session:
+        request_key = object()
+        tasks = [asyncio.create_task(async_parse_web_page(url, session, request_key)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks, timeout=deadline.timeout() if deadline else None):
+                try:
+                    yield await next_done
+                except asyncio.TimeoutError:
+                    # Raised by as_completed itself, page timeouts are handled per page
+                    unfinished = sum(not task.done() for task in tasks)
+                    print(f"Deadline reached, cancelling {unfinished} unfinished pages")
+                    DEADLINE_CUTOFFS.labels("fetch").inc()
+                    return
+                except Exception as e:
+                    print(f"Error processing page: {str(e)}")
+        finally:
+            for task in tasks:
+                task.cancel()
+
 def parse_web_page(url: str) -> str:
     """
     Synchronous function for parsing a single URL (for backward compatibility)
@@ -102,14 +260,7 @@ def parse_web_page(url: str) -> str:
             return ""
             
         # Parse content with trafilatura
-        extracted_text = trafilatura.extract(
-            response.text,
-            favor_precision=True,
-            include_comments=False,
-            include_tables=False,
-            output_format="txt"
-        )
-        return extracted_text or ""
+        return extract_text(response.text)
     except requests.Timeout:
         print(f"Request timeout {url}: exceeded {HTTP_TIMEOUT} seconds")
         return ""